@@ -3,8 +3,12 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from typing import Any, Optional
+from urllib.parse import quote
 
-import requests
+import httpx
+import orjson
+
+_JSON_HEADERS = {"Content-Type": "application/json"}
 
 
 @dataclass
@@ -16,85 +20,138 @@ class CropRectDto:
 
 
 class RemoteSessionApiClient:
-    """Client for the captcha-platform remote-session API."""
+    """Client for the captcha-platform remote-session API.
+
+    Uses a pooled httpx.Client with HTTP/2 so the next-action poll and the
+    screenshot upload multiplex over one kept-alive TLS connection instead of
+    paying serial TCP+TLS round-trips.
+    """
 
     def __init__(self, base_url: str, client_key: str):
         self._base_url = base_url.rstrip("/")
         self._client_key = client_key or ""
-        self._session = requests.Session()
-        self._session.headers["Cache-Control"] = "no-store"
-        self._session.headers["Content-Type"] = "application/json"
+        # b'{"clientKey":"..."' — reusable opening fragment for JSON bodies, so the
+        # key is serialized once instead of per call.
+        self._auth_fragment = orjson.dumps({"clientKey": self._client_key})[:-1]
+        # Per-task URLs with the clientKey already urlencoded in, built once so the
+        # hot endpoints skip per-call string formatting and params encoding.
+        self._task_urls: dict[str, tuple[str, str, str]] = {}
+        # No default Content-Type: httpx sets it per request (JSON vs multipart boundary).
+        # Long keepalive expiry + connect retries: the poll hits one host at high
+        # frequency, so a dropped connection should never cascade into handshake churn.
+        transport = httpx.HTTPTransport(
+            http2=True,
+            retries=2,
+            limits=httpx.Limits(max_connections=8, max_keepalive_connections=8, keepalive_expiry=30.0),
+        )
+        self._client = httpx.Client(
+            base_url=self._base_url,
+            headers={"Cache-Control": "no-store"},
+            timeout=httpx.Timeout(10.0, connect=3.0),
+            transport=transport,
+        )
+
+    def close(self) -> None:
+        self._client.close()
+
+    def __enter__(self) -> "RemoteSessionApiClient":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
 
     def create_task(self, page_url: Optional[str] = None) -> dict[str, Any]:
-        url = f"{self._base_url}/api/createTask"
-        body = {
-            "clientKey": self._client_key,
-            "task": {
-                "type": "RemoteCaptchaTask",
-                "websiteURL": page_url or "https://accounts.hcaptcha.com/demo",
-            },
+        task = {
+            "type": "RemoteCaptchaTask",
+            "websiteURL": page_url or "https://accounts.hcaptcha.com/demo",
         }
-        r = self._session.post(url, json=body)
+        body = self._auth_fragment + b',"task":' + orjson.dumps(task) + b"}"
+        r = self._client.post("/api/createTask", content=body, headers=_JSON_HEADERS)
         r.raise_for_status()
-        return r.json()
+        return orjson.loads(r.content)
+
+    @staticmethod
+    def _image_part(screenshot: bytes, mime: str) -> dict[str, Any]:
+        name = "frame.jpg" if mime == "image/jpeg" else "frame.png"
+        return {"screenshot": (name, screenshot, mime)}
 
     def start_remote_session(
         self,
         task_id: str,
-        screenshot: Optional[str],
+        screenshot: Optional[bytes],
         page_url: str,
         width: int,
         height: int,
         crop_rect: Optional[CropRectDto] = None,
+        mime: str = "image/jpeg",
     ) -> dict[str, Any]:
-        url = f"{self._base_url}/api/client/remote-session/start"
-        body = {
+        data = {
             "clientKey": self._client_key,
             "taskId": task_id,
-            "screenshot": screenshot,
             "pageUrl": page_url,
-            "width": width,
-            "height": height,
-            "cropRect": (
-                {"left": crop_rect.left, "top": crop_rect.top, "width": crop_rect.width, "height": crop_rect.height}
-                if crop_rect
-                else None
-            ),
+            "width": str(width),
+            "height": str(height),
         }
-        r = self._session.post(url, json=body)
+        if crop_rect:
+            data["cropRect"] = orjson.dumps(
+                {"left": crop_rect.left, "top": crop_rect.top, "width": crop_rect.width, "height": crop_rect.height}
+            ).decode("ascii")
+        r = self._client.post(
+            "/api/client/remote-session/start",
+            data=data,
+            files=self._image_part(screenshot, mime) if screenshot else None,
+        )
         r.raise_for_status()
-        return r.json()
+        return orjson.loads(r.content)
+
+    def _urls(self, task_id: str) -> tuple[str, str, str]:
+        """(next-action, screenshot, solved) URLs for a task, cached after first use."""
+        urls = self._task_urls.get(task_id)
+        if urls is None:
+            base = f"{self._base_url}/api/client/remote-session/{task_id}"
+            key = quote(self._client_key)
+            urls = (
+                f"{base}/next-action?clientKey={key}",
+                f"{base}/screenshot?clientKey={key}",
+                f"{base}/solved?clientKey={key}",
+            )
+            self._task_urls[task_id] = urls
+        return urls
 
     def get_next_action(self, task_id: str) -> dict[str, Any]:
-        url = f"{self._base_url}/api/client/remote-session/{task_id}/next-action"
-        r = self._session.get(url, params={"clientKey": self._client_key})
+        r = self._client.get(self._urls(task_id)[0])
         r.raise_for_status()
-        return r.json()
+        return orjson.loads(r.content)
 
     def update_screenshot(
         self,
         task_id: str,
-        screenshot: str,
+        screenshot: bytes,
         width: int,
         height: int,
         crop_rect: Optional[CropRectDto] = None,
+        mime: str = "image/jpeg",
     ) -> None:
-        url = f"{self._base_url}/api/client/remote-session/{task_id}/screenshot"
-        body = {
-            "clientKey": self._client_key,
-            "screenshot": screenshot,
-            "width": width,
-            "height": height,
-            "cropRect": (
-                {"left": crop_rect.left, "top": crop_rect.top, "width": crop_rect.width, "height": crop_rect.height}
-                if crop_rect
-                else None
-            ),
+        data = {
+            "width": str(width),
+            "height": str(height),
         }
-        r = self._session.post(url, json=body)
+        if crop_rect:
+            data["cropRect"] = orjson.dumps(
+                {"left": crop_rect.left, "top": crop_rect.top, "width": crop_rect.width, "height": crop_rect.height}
+            ).decode("ascii")
+        r = self._client.post(
+            self._urls(task_id)[1],
+            data=data,
+            files=self._image_part(screenshot, mime),
+        )
         r.raise_for_status()
 
     def notify_solved(self, task_id: str, token: str) -> None:
-        url = f"{self._base_url}/api/client/remote-session/{task_id}/solved"
-        r = self._session.post(url, json={"clientKey": self._client_key, "token": token})
+        body = b'{"token":' + orjson.dumps(token) + b"}"
+        r = self._client.post(
+            self._urls(task_id)[2],
+            content=body,
+            headers=_JSON_HEADERS,
+        )
         r.raise_for_status()
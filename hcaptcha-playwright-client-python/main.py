@@ -14,6 +14,9 @@ Environment:
   HCAPTCHA_KEEP_OPEN   - "0" or "false" to close browser immediately after solve
   HCAPTCHA_OPENS_AUTOMATICALLY - "1" or "true" if the page opens the captcha itself (e.g. Discord)
   HCAPTCHA_HEADLESS    - "1" or "true" to run browser headless
+  HCAPTCHA_REUSE_BROWSER - "1" or "true" to use a persistent context (warm profile,
+      browser stays up across solves when used as a library)
+  HCAPTCHA_USER_DATA_DIR - Profile dir for the persistent context (default: .pw-profile)
 """
 from __future__ import annotations
 
@@ -27,6 +30,11 @@ try:
 except ImportError:
     pass
 
+# Must run before playwright is imported; set HCAPTCHA_FAST_PW=0 to keep full stack traces.
+if os.environ.get("HCAPTCHA_FAST_PW", "1") == "1":
+    import patch_playwright
+    patch_playwright.enable()
+
 from playwright.sync_api import sync_playwright
 
 from api_client import RemoteSessionApiClient
@@ -48,6 +56,103 @@ def _env_float(name: str, default: float | None = None) -> float | None:
         return default
 
 
+# The captcha task only needs DOM + iframe rendering; GPU, extensions and
+# background networking just compete with the poll/screenshot cadence.
+_LAUNCH_ARGS = [
+    "--disable-gpu",
+    "--no-sandbox",
+    "--disable-dev-shm-usage",
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-features=TranslateUI,BackForwardCache",
+    "--mute-audio",
+]
+
+# Chromium keeps only one --disable-features occurrence, so the persistent
+# extras must be folded into the existing value rather than appended.
+_PERSISTENT_ARGS = [
+    a + ",site-per-process" if a.startswith("--disable-features=") else a
+    for a in _LAUNCH_ARGS
+] + [
+    "--disable-blink-features=AutomationControlled",
+]
+
+
+def _block_heavy_resources(context) -> None:
+    """Abort media/font subresources not served by hcaptcha.com. Images stay — challenge tiles."""
+    def _route(route):
+        req = route.request
+        if req.resource_type in ("media", "font") and "hcaptcha.com" not in req.url:
+            route.abort()
+        else:
+            route.continue_()
+
+    context.route("**/*", _route)
+
+
+def launch_browser(play, headless: bool = False, user_data_dir: str | None = None):
+    """
+    Launch Chromium once for the life of the process. Returns (browser, context);
+    browser is None when a persistent context is used (close the context instead).
+    With user_data_dir set, the profile (cache, cookies) is warm across runs.
+    """
+    try:
+        if user_data_dir:
+            context = play.chromium.launch_persistent_context(
+                user_data_dir,
+                headless=headless,
+                viewport={"width": 1280, "height": 720},
+                args=_PERSISTENT_ARGS,
+            )
+            _block_heavy_resources(context)
+            return None, context
+        browser = play.chromium.launch(headless=headless, args=_LAUNCH_ARGS)
+        context = browser.new_context(viewport={"width": 1280, "height": 720})
+        _block_heavy_resources(context)
+        return browser, context
+    except Exception as e:
+        err = str(e).lower()
+        if "executable doesn't exist" in err or "executable does not exist" in err or ("playwright" in err and "install" in err):
+            print("\nPlaywright browsers are not installed. Run:", file=sys.stderr)
+            print("  playwright install", file=sys.stderr)
+            print("or (Chromium only):  playwright install chromium", file=sys.stderr)
+            print("", file=sys.stderr)
+        raise
+
+
+def solve_one(
+    api: RemoteSessionApiClient,
+    context,
+    page_url: str,
+    wait_timeout: float | None = None,
+    delay_after_load: float = 5.0,
+    captcha_opens_automatically: bool = False,
+    keep_open: bool = False,
+) -> bool:
+    """Solve one captcha in a fresh page of an existing context; closes the page, not the browser."""
+    page = context.new_page()
+    try:
+        _log("Loading page: %s" % page_url)
+        page.goto(page_url, wait_until="domcontentloaded")
+        task_id = run_solve(
+            page,
+            api,
+            page_url,
+            wait_captcha_timeout=wait_timeout,
+            delay_after_captcha_load=delay_after_load,
+            captcha_opens_automatically=captcha_opens_automatically,
+        )
+        if task_id is None:
+            _log("Solve failed")
+            return False
+        if keep_open:
+            _log("Press Enter to close the browser...")
+            input("Press Enter to close the browser...")
+        return True
+    finally:
+        page.close()
+
+
 def main() -> int:
     server_url = os.environ.get("HCAPTCHA_SERVER_URL", "https://hcaptchasolver.com")
     api_key = os.environ.get("HCAPTCHA_CLIENT_KEY", "").strip()
@@ -67,40 +172,24 @@ def main() -> int:
     keep_open = _env_bool("HCAPTCHA_KEEP_OPEN", True)
     captcha_opens_automatically = _env_bool("HCAPTCHA_OPENS_AUTOMATICALLY") or ("discord.com" in page_url.lower())
     headless = _env_bool("HCAPTCHA_HEADLESS", False)
+    reuse_browser = _env_bool("HCAPTCHA_REUSE_BROWSER", False)
+    user_data_dir = os.environ.get("HCAPTCHA_USER_DATA_DIR", ".pw-profile") if reuse_browser else None
 
     api = RemoteSessionApiClient(server_url, api_key)
     _log("Launching browser (Playwright Chromium)...")
     with sync_playwright() as play:
+        browser, context = launch_browser(play, headless=headless, user_data_dir=user_data_dir)
         try:
-            browser = play.chromium.launch(headless=headless)
-        except Exception as e:
-            err = str(e).lower()
-            if "executable doesn't exist" in err or "executable does not exist" in err or ("playwright" in err and "install" in err):
-                print("\nPlaywright browsers are not installed. Run:", file=sys.stderr)
-                print("  playwright install", file=sys.stderr)
-                print("or (Chromium only):  playwright install chromium", file=sys.stderr)
-                print("", file=sys.stderr)
-            raise
-        try:
-            context = browser.new_context(viewport={"width": 1280, "height": 720})
-            page = context.new_page()
-            _log("Loading page: %s" % page_url)
-            page.goto(page_url, wait_until="domcontentloaded")
-            task_id = run_solve(
-                page,
+            ok = solve_one(
                 api,
+                context,
                 page_url,
-                wait_captcha_timeout=wait_timeout,
-                delay_after_captcha_load=delay_after_load,
+                wait_timeout=wait_timeout,
+                delay_after_load=delay_after_load,
                 captcha_opens_automatically=captcha_opens_automatically,
+                keep_open=keep_open,
             )
-            if task_id is None:
-                _log("Solve failed")
-                return 1
-            if keep_open:
-                _log("Press Enter to close the browser...")
-                input("Press Enter to close the browser...")
-            return 0
+            return 0 if ok else 1
         except TimeoutError as e:
             _log("Timeout: %s" % e)
             return 1
@@ -110,7 +199,10 @@ def main() -> int:
             traceback.print_exc()
             return 1
         finally:
-            browser.close()
+            if browser is not None:
+                browser.close()
+            else:
+                context.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,25 @@
+"""Stub out inspect.stack() to cut Playwright's per-call dispatcher overhead.
+
+Playwright's sync dispatcher collects a full Python stack on every API call
+(page.evaluate, mouse.click, screenshot, ...) just to attribute the call site
+in traces — profiled at roughly a quarter of driver CPU in a tight loop like
+_run_loop. We never use those traces, so enable() replaces inspect.stack with
+a no-op. Must be called before playwright is imported.
+"""
+from __future__ import annotations
+
+import inspect
+
+_orig_stack = inspect.stack
+
+
+def _fast_stack(*args, **kwargs):
+    return []
+
+
+def enable() -> None:
+    inspect.stack = _fast_stack
+
+
+def disable() -> None:
+    inspect.stack = _orig_stack
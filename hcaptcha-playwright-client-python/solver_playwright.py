@@ -1,18 +1,28 @@
 """Playwright-based remote solve flow for hcaptchasolver.com."""
 from __future__ import annotations
 
-import base64
+import binascii
+import io
+import queue
+import threading
 import time
 from dataclasses import dataclass
 from typing import Optional
 
-from playwright.sync_api import Page, TimeoutError as PlaywrightTimeoutError
+import numpy as np
+from PIL import Image
+from playwright.sync_api import CDPSession, Page, TimeoutError as PlaywrightTimeoutError
 
-from api_client import RemoteSessionApiClient, CropRectDto
+from api_client import RemoteSessionApiClient
 
 MIN_SIZE = 260
 POLL_S = 0.12
 SCREENSHOT_INTERVAL_S = 0.2
+POLL_MAX_S = 1.0
+SCREENSHOT_KEEPALIVE_S = 1.5
+SCREENSHOT_JPEG_QUALITY = 70
+AHASH_DISTANCE = 3
+DRAG_STEPS = 12
 LOG_PREFIX = "[hcaptcha-playwright]"
 
 
@@ -28,6 +38,57 @@ class _CropRect:
     height: int
 
 
+def _open_cdp_session(page: Page) -> Optional[CDPSession]:
+    """Open a CDP session for fast screenshot capture. Returns None if unavailable (non-Chromium)."""
+    try:
+        return page.context.new_cdp_session(page)
+    except Exception as e:
+        _log("CDP session unavailable, falling back to page.screenshot(): %s" % e)
+        return None
+
+
+def _capture_frame(page: Page, cdp: Optional[CDPSession], crop: Optional[_CropRect]) -> tuple[bytes, str]:
+    """
+    Capture a screenshot, returned as (raw image bytes, mime type). With CDP, Chromium
+    encodes JPEG and crops to the captcha rect in the renderer — no PNG zlib pass. The
+    image is already cropped, so no cropRect is sent to the server; the bytes go out as
+    a multipart binary part, never re-encoded to base64.
+    """
+    if cdp is not None:
+        params: dict = {"format": "jpeg", "quality": SCREENSHOT_JPEG_QUALITY}
+        if crop is not None:
+            params["clip"] = {
+                "x": crop.left,
+                "y": crop.top,
+                "width": crop.width,
+                "height": crop.height,
+                "scale": 1,
+            }
+        return binascii.a2b_base64(cdp.send("Page.captureScreenshot", params)["data"]), "image/jpeg"
+    # Fallback path crops at capture time too — never ship the full viewport
+    # just to have it cropped later.
+    clip = (
+        {"x": crop.left, "y": crop.top, "width": crop.width, "height": crop.height}
+        if crop is not None
+        else None
+    )
+    return page.screenshot(clip=clip, type="jpeg", quality=SCREENSHOT_JPEG_QUALITY), "image/jpeg"
+
+
+def _ahash(image_bytes: bytes) -> int:
+    """64-bit average hash of an image: 8x8 grayscale, one bit per pixel above the mean."""
+    img = Image.open(io.BytesIO(image_bytes)).convert("L").resize((8, 8), Image.LANCZOS)
+    px = np.frombuffer(img.tobytes(), dtype=np.uint8)
+    return int.from_bytes(np.packbits(px > px.mean()).tobytes(), "big")
+
+
+def _frame_hash(image_bytes: bytes) -> Optional[int]:
+    try:
+        return _ahash(image_bytes)
+    except Exception:
+        return None
+
+
 def _get_viewport_and_crop(page: Page) -> tuple[Optional[_CropRect], int, int]:
     result = page.evaluate("""() => {
         const iframes = document.querySelectorAll('iframe[src*="hcaptcha.com"]');
@@ -69,9 +130,18 @@ def _wait_for_iframe(page: Page, timeout: Optional[float] = None) -> None:
         raise TimeoutError("hCaptcha iframe did not appear in time")
 
 
-def _is_already_expanded(page: Page) -> bool:
-    rect, _, _ = _get_viewport_and_crop(page)
-    return rect is not None and rect.width >= MIN_SIZE and rect.height >= MIN_SIZE
+def _probe_iframes(page: Page) -> dict:
+    """One JS round-trip returning the largest iframe rect, the checkbox rect and viewport size."""
+    return page.evaluate("""() => {
+        const all = [...document.querySelectorAll('iframe[src*="hcaptcha.com"]')].map(f => {
+            const r = f.getBoundingClientRect();
+            return { left: Math.round(r.left), top: Math.round(r.top), width: Math.round(r.width), height: Math.round(r.height) };
+        }).filter(r => r.width >= 50 && r.height >= 50);
+        let big = null;
+        for (const r of all) if (!big || r.width * r.height > big.width * big.height) big = r;
+        const small = all.find(r => r.width < 250 && r.height < 250) || null;
+        return { big, small, viewportW: window.innerWidth || 1280, viewportH: window.innerHeight || 720 };
+    }""") or {}
 
 
 def _wait_expanded(
@@ -79,33 +149,22 @@ def _wait_expanded(
     timeout: Optional[float] = None,
 ) -> tuple[Optional[_CropRect], int, int]:
     _log("Waiting for captcha to expand (min %dx%d)..." % (MIN_SIZE, MIN_SIZE))
-    deadline = (time.time() + timeout) if timeout is not None else None
-    while True:
-        rect, w, h = _get_viewport_and_crop(page)
-        if rect is not None and rect.width >= MIN_SIZE and rect.height >= MIN_SIZE:
-            _log("Captcha expanded: %dx%d at (%d, %d)" % (rect.width, rect.height, rect.left, rect.top))
-            return rect, w, h
-        if deadline is not None and time.time() >= deadline:
-            _log("Timeout: captcha did not expand in time")
-            raise TimeoutError("Captcha did not expand in time")
-        time.sleep(1.0)
-
-
-def _click_checkbox_iframe(page: Page) -> None:
-    """Click at the center of the checkbox (small) iframe to expand the captcha."""
-    result = page.evaluate("""() => {
-        const iframes = document.querySelectorAll('iframe[src*="hcaptcha.com"]');
-        for (const f of iframes) {
-            const r = f.getBoundingClientRect();
-            if (r.width >= 250 && r.height >= 250) continue;
-            if (r.width >= 50 && r.height >= 50) {
-                return { x: Math.round(r.left + r.width / 2), y: Math.round(r.top + r.height / 2) };
-            }
-        }
-        return null;
-    }""")
-    if result:
-        page.mouse.click(result["x"], result["y"])
+    # Chromium signals the instant the iframe crosses the threshold — no Python-side polling.
+    timeout_ms = int(timeout * 1000) if timeout else 0
+    try:
+        page.wait_for_function(
+            """() => [...document.querySelectorAll('iframe[src*="hcaptcha.com"]')]
+                .some(f => { const r = f.getBoundingClientRect(); return r.width >= %d && r.height >= %d; })"""
+            % (MIN_SIZE, MIN_SIZE),
+            timeout=timeout_ms,
+        )
+    except PlaywrightTimeoutError:
+        _log("Timeout: captcha did not expand in time")
+        raise TimeoutError("Captcha did not expand in time")
+    rect, w, h = _get_viewport_and_crop(page)
+    if rect is not None:
+        _log("Captcha expanded: %dx%d at (%d, %d)" % (rect.width, rect.height, rect.left, rect.top))
+    return rect, w, h
 
 
 def _open_checkbox_if_needed(
@@ -118,82 +177,206 @@ def _open_checkbox_if_needed(
     if captcha_opens_automatically:
         _log("Captcha opens automatically; waiting for it to load (no checkbox click)")
         return
-    if _is_already_expanded(page):
+    # One probe answers both "already expanded?" and "where is the checkbox?".
+    probe = _probe_iframes(page)
+    big = probe.get("big")
+    if big and big["width"] >= MIN_SIZE and big["height"] >= MIN_SIZE:
         _log("Captcha already expanded, skipping checkbox click")
         return
     _log("Clicking checkbox to expand captcha...")
-    _click_checkbox_iframe(page)
+    small = probe.get("small")
+    if small:
+        page.mouse.click(small["left"] + small["width"] // 2, small["top"] + small["height"] // 2)
     time.sleep(1.5)
 
 
-def _get_token(page: Page) -> Optional[str]:
+def _dispatch_drag(page: Page, cdp: Optional[CDPSession], x1: int, y1: int, x2: int, y2: int) -> None:
+    """
+    Drag from (x1, y1) to (x2, y2). With CDP, the press/move/release sequence goes out
+    as raw Input.dispatchMouseEvent sends on the existing websocket, skipping the
+    Playwright dispatcher for each interpolated move.
+    """
+    xs = np.linspace(x1, x2, DRAG_STEPS + 1).astype(int)
+    ys = np.linspace(y1, y2, DRAG_STEPS + 1).astype(int)
+    if cdp is None:
+        page.mouse.move(x1, y1)
+        page.mouse.down()
+        for x, y in zip(xs[1:], ys[1:]):
+            page.mouse.move(int(x), int(y))
+        page.mouse.up()
+        return
+    cdp.send("Input.dispatchMouseEvent", {"type": "mouseMoved", "x": x1, "y": y1, "button": "none"})
+    cdp.send("Input.dispatchMouseEvent", {
+        "type": "mousePressed", "x": x1, "y": y1, "button": "left", "buttons": 1, "clickCount": 1,
+    })
+    for x, y in zip(xs[1:], ys[1:]):
+        cdp.send("Input.dispatchMouseEvent", {
+            "type": "mouseMoved", "x": int(x), "y": int(y), "button": "left", "buttons": 1,
+        })
+    cdp.send("Input.dispatchMouseEvent", {
+        "type": "mouseReleased", "x": x2, "y": y2, "button": "left", "buttons": 0, "clickCount": 1,
+    })
+
+
+# Persistent in-page tick function: one call returns the iframe rect, the token
+# and the viewport size. The token is read from the element on every tick:
+# hCaptcha sets it via a .value property write, which fires no DOM mutation,
+# so an observer-cached value can lag forever behind the actual token.
+_TICK_INSTALL_JS = """() => {
+    window.__hc_tick = () => {
+        const el = document.querySelector('textarea[name="h-captcha-response"], input[name="h-captcha-response"]');
+        const token = el && el.value ? el.value.trim() : '';
+        const rects = [...document.querySelectorAll('iframe[src*="hcaptcha.com"]')]
+            .map(e => { const r = e.getBoundingClientRect(); return { l: Math.round(r.left), t: Math.round(r.top), w: Math.round(r.width), h: Math.round(r.height) }; })
+            .filter(r => r.w >= 50 && r.h >= 50)
+            .sort((a, b) => b.w * b.h - a.w * a.h);
+        return { rect: rects[0] || null, token: token, vw: window.innerWidth || 1280, vh: window.innerHeight || 720 };
+    };
+}"""
+
+
+def _tick_probe(page: Page, cdp: Optional[CDPSession]) -> Optional[dict]:
+    """
+    One round-trip per tick: rect + token + viewport from window.__hc_tick(). With CDP
+    the call goes out as a raw Runtime.evaluate, bypassing the Playwright dispatcher;
+    the function is re-installed if navigation wiped it.
+    """
     try:
-        val = page.evaluate("""() => {
-            const el = document.querySelector('textarea[name="h-captcha-response"], input[name="h-captcha-response"]');
-            return el ? (el.value || '').trim() : '';
-        }""")
-        return val or None
+        if cdp is not None:
+            res = cdp.send("Runtime.evaluate", {
+                "expression": "window.__hc_tick && window.__hc_tick()",
+                "returnByValue": True,
+            })
+            val = res.get("result", {}).get("value")
+        else:
+            val = page.evaluate("() => window.__hc_tick && window.__hc_tick()")
+        if not val:
+            page.evaluate(_TICK_INSTALL_JS)
+            val = page.evaluate("() => window.__hc_tick()")
+        return val
     except Exception:
         return None
 
 
-def _run_loop(page: Page, api: RemoteSessionApiClient, task_id: str, crop: Optional[_CropRect]) -> None:
+def _run_loop(
+    page: Page,
+    api: RemoteSessionApiClient,
+    task_id: str,
+    crop: Optional[_CropRect],
+    cdp: Optional[CDPSession] = None,
+) -> None:
     last_shot = [time.perf_counter()]
-    while True:
+    last_upload = [time.perf_counter()]
+    prev_hash: Optional[int] = None
+    # Poll interval backs off exponentially while the worker is idle (no action),
+    # and snaps back to POLL_S the moment an action arrives.
+    poll = POLL_S
+    misses = 0
+    try:
+        page.evaluate(_TICK_INSTALL_JS)
+    except Exception as e:
+        _log("Tick probe install error: %s" % e)
+
+    # Uploads run on a background thread so a slow POST never delays action polling.
+    # The queue is bounded at 2 and drops the oldest frame when full (newest wins).
+    upload_q: "queue.Queue[Optional[tuple]]" = queue.Queue(maxsize=2)
+
+    def _uploader() -> None:
+        while True:
+            item = upload_q.get()
+            if item is None:
+                break
+            try:
+                api.update_screenshot(*item)
+            except Exception as e:
+                _log("Screenshot update error: %s" % e)
+
+    def _enqueue_newest(item: tuple) -> None:
         try:
-            resp = api.get_next_action(task_id)
-            status = resp.get("status")
-            if status in ("expired", "solved"):
-                _log("Session ended: %s" % status)
-                return
-            action = resp.get("action")
-            if isinstance(action, dict):
-                atype = action.get("type")
-                if atype == "click":
-                    x, y = action.get("x"), action.get("y")
-                    if x is not None and y is not None:
-                        _log("Worker action: click (%d, %d)" % (int(x), int(y)))
-                        page.mouse.click(int(x), int(y))
-                        time.sleep(0.08)
-                elif atype == "drag":
-                    fr, to = action.get("from"), action.get("to")
-                    if fr and to:
-                        _log("Worker action: drag")
-                        x1, y1 = int(fr["x"]), int(fr["y"])
-                        x2, y2 = int(to["x"]), int(to["y"])
-                        page.mouse.move(x1, y1)
-                        page.mouse.down()
-                        for i in range(1, 13):
-                            t = i / 12.0
-                            x = int(x1 + (x2 - x1) * t)
-                            y = int(y1 + (y2 - y1) * t)
-                            page.mouse.move(x, y)
-                        page.mouse.up()
-                        time.sleep(0.08)
-            token = _get_token(page)
-            if token:
-                _log("Captcha solved, submitting token...")
-                api.notify_solved(task_id, token)
-                _log("Token submitted successfully")
+            upload_q.put_nowait(item)
+        except queue.Full:
+            try:
+                upload_q.get_nowait()
+            except queue.Empty:
+                pass
+            upload_q.put_nowait(item)
+
+    uploader = threading.Thread(target=_uploader, name="screenshot-uploader", daemon=True)
+    uploader.start()
+    try:
+        while True:
+            try:
+                resp = api.get_next_action(task_id)
+                status = resp.get("status")
+                if status in ("expired", "solved"):
+                    _log("Session ended: %s" % status)
+                    return
+                action = resp.get("action")
+                if isinstance(action, dict):
+                    misses = 0
+                    poll = POLL_S
+                    atype = action.get("type")
+                    if atype == "click":
+                        x, y = action.get("x"), action.get("y")
+                        if x is not None and y is not None:
+                            _log("Worker action: click (%d, %d)" % (int(x), int(y)))
+                            page.mouse.click(int(x), int(y))
+                            time.sleep(0.08)
+                    elif atype == "drag":
+                        fr, to = action.get("from"), action.get("to")
+                        if fr and to:
+                            _log("Worker action: drag")
+                            _dispatch_drag(page, cdp, int(fr["x"]), int(fr["y"]), int(to["x"]), int(to["y"]))
+                            time.sleep(0.08)
+                else:
+                    misses += 1
+                    poll = min(POLL_MAX_S, POLL_S * (2 ** min(misses, 4)))
+                state = _tick_probe(page, cdp) or {}
+                token = state.get("token") or None
+                if token:
+                    _log("Captcha solved, submitting token...")
+                    api.notify_solved(task_id, token)
+                    _log("Token submitted successfully")
+                    return
+                now = time.perf_counter()
+                if now - last_shot[0] >= SCREENSHOT_INTERVAL_S:
+                    try:
+                        r = state.get("rect")
+                        rect = _CropRect(r["l"], r["t"], r["w"], r["h"]) if r else None
+                        w = int(state.get("vw") or 1280)
+                        h = int(state.get("vh") or 720)
+                        frame, mime = _capture_frame(page, cdp, rect or crop)
+                        frame_hash = _frame_hash(frame)
+                        unchanged = (
+                            frame_hash is not None
+                            and prev_hash is not None
+                            and bin(frame_hash ^ prev_hash).count("1") < AHASH_DISTANCE
+                        )
+                        # Skip the upload when the frame looks the same; still send one
+                        # every SCREENSHOT_KEEPALIVE_S as a keepalive.
+                        if not unchanged or now - last_upload[0] >= SCREENSHOT_KEEPALIVE_S:
+                            _enqueue_newest((task_id, frame, w, h, None, mime))
+                            last_upload[0] = now
+                        if frame_hash is not None:
+                            prev_hash = frame_hash
+                        last_shot[0] = now
+                    except Exception as e:
+                        _log("Screenshot capture error: %s" % e)
+                # Cap the idle backoff at the time left until the next frame
+                # is due: capture happens inline in this loop, so sleeping the
+                # full backed-off interval would drop the worker's view to
+                # ~1 fps exactly while they are looking at the screen.
+                until_shot = max(0.05, SCREENSHOT_INTERVAL_S - (time.perf_counter() - last_shot[0]))
+                time.sleep(min(poll, until_shot))
+            except KeyboardInterrupt:
+                _log("Interrupted by user")
                 return
-            now = time.perf_counter()
-            if now - last_shot[0] >= SCREENSHOT_INTERVAL_S:
-                try:
-                    rect, w, h = _get_viewport_and_crop(page)
-                    raw = page.screenshot()
-                    b64 = base64.b64encode(raw).decode("ascii")
-                    dto = CropRectDto(rect.left, rect.top, rect.width, rect.height) if rect else None
-                    api.update_screenshot(task_id, "data:image/png;base64," + b64, w, h, dto)
-                    last_shot[0] = now
-                except Exception as e:
-                    _log("Screenshot update error: %s" % e)
-            time.sleep(POLL_S)
-        except KeyboardInterrupt:
-            _log("Interrupted by user")
-            return
-        except Exception as e:
-            _log("Loop error: %s" % e)
-            time.sleep(1.0)
+            except Exception as e:
+                _log("Loop error: %s" % e)
+                time.sleep(1.0)
+    finally:
+        upload_q.put(None)
+        uploader.join(timeout=5.0)
 
 
 def run_solve(
@@ -224,10 +407,10 @@ def run_solve(
         return None
     task_id = res["taskId"]
     _log("Task created: %s. Starting remote session..." % task_id)
-    raw = page.screenshot()
-    b64 = base64.b64encode(raw).decode("ascii")
-    dto = CropRectDto(crop.left, crop.top, crop.width, crop.height) if crop else None
-    api.start_remote_session(task_id, "data:image/png;base64," + b64, page_url, width, height, dto)
+    cdp = _open_cdp_session(page)
+    # Screenshots are cropped at capture time (CDP clip), so no cropRect is sent.
+    frame, mime = _capture_frame(page, cdp, crop)
+    api.start_remote_session(task_id, frame, page_url, width, height, None, mime=mime)
     _log("Waiting for worker to solve...")
-    _run_loop(page, api, task_id, crop)
+    _run_loop(page, api, task_id, crop, cdp)
     return task_id
@@ -0,0 +1,401 @@
+"""Async Playwright remote solve flow: action polling, screenshot capture and upload overlap.
+
+Same protocol as solver_playwright.py, but built on playwright.async_api + aiohttp so the
+next-action poll, the CDP screenshot capture, and the previous screenshot upload run
+concurrently instead of serializing on one thread.
+"""
+from __future__ import annotations
+
+import asyncio
+import base64
+import time
+from typing import Any, Optional
+
+import aiohttp
+from playwright.async_api import CDPSession, Page, TimeoutError as PlaywrightTimeoutError
+
+from solver_playwright import (
+    AHASH_DISTANCE,
+    MIN_SIZE,
+    POLL_S,
+    SCREENSHOT_INTERVAL_S,
+    SCREENSHOT_JPEG_QUALITY,
+    SCREENSHOT_KEEPALIVE_S,
+    _CropRect,
+    _frame_hash,
+    _log,
+)
+
+
+class AsyncRemoteSessionApiClient:
+    """aiohttp-based client for the captcha-platform remote-session API (kept-alive)."""
+
+    def __init__(self, base_url: str, client_key: str):
+        self._base_url = base_url.rstrip("/")
+        self._client_key = client_key or ""
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def _ensure_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                headers={"Cache-Control": "no-store"},
+                timeout=aiohttp.ClientTimeout(total=10, connect=3),
+            )
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    async def __aenter__(self) -> "AsyncRemoteSessionApiClient":
+        await self._ensure_session()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    async def _post(self, path: str, body: dict[str, Any]) -> dict[str, Any]:
+        session = await self._ensure_session()
+        async with session.post(self._base_url + path, json=body) as r:
+            r.raise_for_status()
+            if r.content_type == "application/json":
+                return await r.json()
+            return {}
+
+    async def create_task(self, page_url: Optional[str] = None) -> dict[str, Any]:
+        return await self._post("/api/createTask", {
+            "clientKey": self._client_key,
+            "task": {
+                "type": "RemoteCaptchaTask",
+                "websiteURL": page_url or "https://accounts.hcaptcha.com/demo",
+            },
+        })
+
+    async def start_remote_session(
+        self,
+        task_id: str,
+        screenshot: Optional[str],
+        page_url: str,
+        width: int,
+        height: int,
+    ) -> dict[str, Any]:
+        return await self._post("/api/client/remote-session/start", {
+            "clientKey": self._client_key,
+            "taskId": task_id,
+            "screenshot": screenshot,
+            "pageUrl": page_url,
+            "width": width,
+            "height": height,
+            "cropRect": None,
+        })
+
+    async def get_next_action(self, task_id: str) -> dict[str, Any]:
+        session = await self._ensure_session()
+        url = f"{self._base_url}/api/client/remote-session/{task_id}/next-action"
+        async with session.get(url, params={"clientKey": self._client_key}) as r:
+            r.raise_for_status()
+            return await r.json()
+
+    async def update_screenshot(self, task_id: str, screenshot: str, width: int, height: int) -> None:
+        await self._post(f"/api/client/remote-session/{task_id}/screenshot", {
+            "clientKey": self._client_key,
+            "screenshot": screenshot,
+            "width": width,
+            "height": height,
+            "cropRect": None,
+        })
+
+    async def notify_solved(self, task_id: str, token: str) -> None:
+        await self._post(f"/api/client/remote-session/{task_id}/solved", {
+            "clientKey": self._client_key,
+            "token": token,
+        })
+
+
+async def _get_viewport_and_crop(page: Page) -> tuple[Optional[_CropRect], int, int]:
+    result = await page.evaluate("""() => {
+        const iframes = document.querySelectorAll('iframe[src*="hcaptcha.com"]');
+        let best = null, bestArea = 0;
+        for (let i = 0; i < iframes.length; i++) {
+            const r = iframes[i].getBoundingClientRect();
+            if (r.width < 50 || r.height < 50) continue;
+            const area = r.width * r.height;
+            if (area > bestArea) { bestArea = area; best = r; }
+        }
+        const w = window.innerWidth || 1280, h = window.innerHeight || 720;
+        if (best) return { left: Math.round(best.left), top: Math.round(best.top), width: Math.round(best.width), height: Math.round(best.height), viewportW: w, viewportH: h };
+        return { viewportW: w, viewportH: h };
+    }""")
+    if not result:
+        return None, 1280, 720
+    vw = int(result.get("viewportW") or 1280)
+    vh = int(result.get("viewportH") or 720)
+    rect = None
+    if "left" in result:
+        rect = _CropRect(
+            left=int(result.get("left", 0)),
+            top=int(result.get("top", 0)),
+            width=int(result.get("width", 0)),
+            height=int(result.get("height", 0)),
+        )
+    return rect, vw, vh
+
+
+async def _open_cdp_session(page: Page) -> Optional[CDPSession]:
+    try:
+        return await page.context.new_cdp_session(page)
+    except Exception as e:
+        _log("CDP session unavailable, falling back to page.screenshot(): %s" % e)
+        return None
+
+
+async def _capture_data_url(page: Page, cdp: Optional[CDPSession], crop: Optional[_CropRect]) -> str:
+    if cdp is not None:
+        params: dict = {"format": "jpeg", "quality": SCREENSHOT_JPEG_QUALITY}
+        if crop is not None:
+            params["clip"] = {
+                "x": crop.left,
+                "y": crop.top,
+                "width": crop.width,
+                "height": crop.height,
+                "scale": 1,
+            }
+        return "data:image/jpeg;base64," + (await cdp.send("Page.captureScreenshot", params))["data"]
+    raw = await page.screenshot()
+    return "data:image/png;base64," + base64.b64encode(raw).decode("ascii")
+
+
+async def _wait_for_iframe(page: Page, timeout: Optional[float] = None) -> None:
+    _log("Waiting for hCaptcha iframe...")
+    timeout_ms = int(timeout * 1000) if timeout else 0
+    try:
+        await page.wait_for_selector("iframe[src*='hcaptcha.com']", timeout=timeout_ms)
+        _log("hCaptcha iframe found")
+    except PlaywrightTimeoutError:
+        _log("Timeout: hCaptcha iframe did not appear")
+        raise TimeoutError("hCaptcha iframe did not appear in time")
+
+
+async def _is_already_expanded(page: Page) -> bool:
+    rect, _, _ = await _get_viewport_and_crop(page)
+    return rect is not None and rect.width >= MIN_SIZE and rect.height >= MIN_SIZE
+
+
+async def _wait_expanded(
+    page: Page,
+    timeout: Optional[float] = None,
+) -> tuple[Optional[_CropRect], int, int]:
+    _log("Waiting for captcha to expand (min %dx%d)..." % (MIN_SIZE, MIN_SIZE))
+    # Chromium signals the instant the iframe crosses the threshold — no Python-side polling.
+    timeout_ms = int(timeout * 1000) if timeout else 0
+    try:
+        await page.wait_for_function(
+            """() => [...document.querySelectorAll('iframe[src*="hcaptcha.com"]')]
+                .some(f => { const r = f.getBoundingClientRect(); return r.width >= %d && r.height >= %d; })"""
+            % (MIN_SIZE, MIN_SIZE),
+            timeout=timeout_ms,
+        )
+    except PlaywrightTimeoutError:
+        _log("Timeout: captcha did not expand in time")
+        raise TimeoutError("Captcha did not expand in time")
+    rect, w, h = await _get_viewport_and_crop(page)
+    if rect is not None:
+        _log("Captcha expanded: %dx%d at (%d, %d)" % (rect.width, rect.height, rect.left, rect.top))
+    return rect, w, h
+
+
+async def _click_checkbox_iframe(page: Page) -> None:
+    result = await page.evaluate("""() => {
+        const iframes = document.querySelectorAll('iframe[src*="hcaptcha.com"]');
+        for (const f of iframes) {
+            const r = f.getBoundingClientRect();
+            if (r.width >= 250 && r.height >= 250) continue;
+            if (r.width >= 50 && r.height >= 50) {
+                return { x: Math.round(r.left + r.width / 2), y: Math.round(r.top + r.height / 2) };
+            }
+        }
+        return null;
+    }""")
+    if result:
+        await page.mouse.click(result["x"], result["y"])
+
+
+async def _open_checkbox_if_needed(
+    page: Page,
+    wait_captcha_timeout: Optional[float] = None,
+    captcha_opens_automatically: bool = False,
+) -> None:
+    await _wait_for_iframe(page, timeout=wait_captcha_timeout)
+    await asyncio.sleep(1.2)
+    if captcha_opens_automatically:
+        _log("Captcha opens automatically; waiting for it to load (no checkbox click)")
+        return
+    if await _is_already_expanded(page):
+        _log("Captcha already expanded, skipping checkbox click")
+        return
+    _log("Clicking checkbox to expand captcha...")
+    await _click_checkbox_iframe(page)
+    await asyncio.sleep(1.5)
+
+
+async def _get_token(page: Page) -> Optional[str]:
+    try:
+        val = await page.evaluate("""() => {
+            const el = document.querySelector('textarea[name="h-captcha-response"], input[name="h-captcha-response"]');
+            return el ? (el.value || '').trim() : '';
+        }""")
+        return val or None
+    except Exception:
+        return None
+
+
+async def _screenshot_producer(
+    page: Page,
+    cdp: Optional[CDPSession],
+    crop: Optional[_CropRect],
+    q: "asyncio.Queue[tuple[str, int, int]]",
+    stop: asyncio.Event,
+) -> None:
+    """Capture frames on a timer and push them to the upload queue (newest wins)."""
+    while not stop.is_set():
+        try:
+            rect, w, h = await _get_viewport_and_crop(page)
+            data_url = await _capture_data_url(page, cdp, rect or crop)
+            if q.full():
+                try:
+                    q.get_nowait()
+                except asyncio.QueueEmpty:
+                    pass
+            q.put_nowait((data_url, w, h))
+        except Exception as e:
+            _log("Screenshot capture error: %s" % e)
+        await asyncio.sleep(SCREENSHOT_INTERVAL_S)
+
+
+async def _screenshot_uploader(
+    api: AsyncRemoteSessionApiClient,
+    task_id: str,
+    q: "asyncio.Queue[tuple[str, int, int]]",
+    stop: asyncio.Event,
+) -> None:
+    """Consume captured frames and POST them, deduping visually unchanged ones."""
+    prev_hash: Optional[int] = None
+    last_upload = time.perf_counter()
+    while not stop.is_set():
+        try:
+            data_url, w, h = await asyncio.wait_for(q.get(), timeout=0.5)
+        except asyncio.TimeoutError:
+            continue
+        try:
+            # _frame_hash works on raw image bytes; strip the data-URL envelope.
+            frame_hash = _frame_hash(base64.b64decode(data_url.split(",", 1)[1]))
+            now = time.perf_counter()
+            unchanged = (
+                frame_hash is not None
+                and prev_hash is not None
+                and bin(frame_hash ^ prev_hash).count("1") < AHASH_DISTANCE
+            )
+            if not unchanged or now - last_upload >= SCREENSHOT_KEEPALIVE_S:
+                await api.update_screenshot(task_id, data_url, w, h)
+                last_upload = now
+            if frame_hash is not None:
+                prev_hash = frame_hash
+        except Exception as e:
+            _log("Screenshot update error: %s" % e)
+
+
+async def _run_loop(
+    page: Page,
+    api: AsyncRemoteSessionApiClient,
+    task_id: str,
+    crop: Optional[_CropRect],
+    cdp: Optional[CDPSession] = None,
+) -> None:
+    q: "asyncio.Queue[tuple[str, int, int]]" = asyncio.Queue(maxsize=2)
+    stop = asyncio.Event()
+    tasks = [
+        asyncio.ensure_future(_screenshot_producer(page, cdp, crop, q, stop)),
+        asyncio.ensure_future(_screenshot_uploader(api, task_id, q, stop)),
+    ]
+    try:
+        while True:
+            try:
+                resp = await api.get_next_action(task_id)
+                status = resp.get("status")
+                if status in ("expired", "solved"):
+                    _log("Session ended: %s" % status)
+                    return
+                action = resp.get("action")
+                if isinstance(action, dict):
+                    atype = action.get("type")
+                    if atype == "click":
+                        x, y = action.get("x"), action.get("y")
+                        if x is not None and y is not None:
+                            _log("Worker action: click (%d, %d)" % (int(x), int(y)))
+                            await page.mouse.click(int(x), int(y))
+                            await asyncio.sleep(0.08)
+                    elif atype == "drag":
+                        fr, to = action.get("from"), action.get("to")
+                        if fr and to:
+                            _log("Worker action: drag")
+                            x1, y1 = int(fr["x"]), int(fr["y"])
+                            x2, y2 = int(to["x"]), int(to["y"])
+                            await page.mouse.move(x1, y1)
+                            await page.mouse.down()
+                            for i in range(1, 13):
+                                t = i / 12.0
+                                await page.mouse.move(int(x1 + (x2 - x1) * t), int(y1 + (y2 - y1) * t))
+                            await page.mouse.up()
+                            await asyncio.sleep(0.08)
+                token = await _get_token(page)
+                if token:
+                    _log("Captcha solved, submitting token...")
+                    await api.notify_solved(task_id, token)
+                    _log("Token submitted successfully")
+                    return
+                await asyncio.sleep(POLL_S)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                _log("Loop error: %s" % e)
+                await asyncio.sleep(1.0)
+    finally:
+        stop.set()
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def run_solve(
+    page: Page,
+    api: AsyncRemoteSessionApiClient,
+    page_url: str,
+    wait_captcha_timeout: Optional[float] = None,
+    delay_after_captcha_load: float = 5.0,
+    captcha_opens_automatically: bool = False,
+) -> Optional[str]:
+    """
+    Run the full remote solve flow (async). Page must be on the URL with captcha.
+    Returns task_id on success, None on failure.
+    """
+    await _open_checkbox_if_needed(
+        page,
+        wait_captcha_timeout=wait_captcha_timeout,
+        captcha_opens_automatically=captcha_opens_automatically,
+    )
+    crop, width, height = await _wait_expanded(page, timeout=wait_captcha_timeout)
+    if delay_after_captcha_load > 0:
+        _log("Waiting %.1fs after captcha load before sending screenshot..." % delay_after_captcha_load)
+        await asyncio.sleep(delay_after_captcha_load)
+    _log("Creating task...")
+    res = await api.create_task(page_url)
+    if res.get("errorId") != 0 or not res.get("taskId"):
+        _log("Create task failed: errorId=%s %s" % (res.get("errorId"), res.get("errorDescription", "")))
+        return None
+    task_id = res["taskId"]
+    _log("Task created: %s. Starting remote session..." % task_id)
+    cdp = await _open_cdp_session(page)
+    await api.start_remote_session(task_id, await _capture_data_url(page, cdp, crop), page_url, width, height)
+    _log("Waiting for worker to solve...")
+    await _run_loop(page, api, task_id, crop, cdp)
+    return task_id
@@ -1,12 +1,42 @@
 from __future__ import annotations
 
+import base64
+import io
+import queue
+import threading
 import time
 from dataclasses import dataclass
 from typing import Optional, TYPE_CHECKING
 
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional; PNG path still works without it
+    Image = None
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# xxh3 hashes a 1 MB frame in ~50us; the builtin bytes hash (siphash) is a
+# slower but dependency-free stand-in for the same dedup purpose.
+try:
+    import xxhash
+
+    def _frame_hash(data: bytes) -> int:
+        return xxhash.xxh3_64(data).intdigest()
+except ImportError:
+    def _frame_hash(data: bytes) -> int:
+        return hash(data)
+
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.action_chains import ActionChains
-from selenium.common.exceptions import NoSuchElementException, ElementNotInteractableException
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import (
+    ElementNotInteractableException,
+    StaleElementReferenceException,
+    TimeoutException,
+)
 
 from kenzx_captcha.api_client import _ApiClient, CropRectDto
 
@@ -16,6 +46,12 @@ if TYPE_CHECKING:
 MIN_SIZE = 260
 POLL_S = 0.12
 SCREENSHOT_INTERVAL_S = 0.2
+SCREENSHOT_KEEPALIVE_S = 1.5
+WAIT_POLL_S = 0.15
+JPEG_QUALITY = 70
+# Sum of absolute per-pixel differences over a 64x64 grayscale thumbnail below
+# which two frames are treated as the same screen.
+THUMB_DIFF_THRESHOLD = 2000
 
 _LOG_PREFIX = "[kenzx_captcha]"
 
@@ -70,35 +106,58 @@ def _wait_expanded(
 ) -> tuple[Optional[_CropRect], int, int]:
     """Wait until captcha iframe is expanded (big enough). timeout=None = wait indefinitely."""
     _log("Waiting for captcha to expand (min %dx%d)..." % (MIN_SIZE, MIN_SIZE))
-    poll_interval = 1.0
-    deadline = (time.time() + timeout) if timeout is not None else None
-    while True:
-        rect, w, h = _get_viewport_and_crop(driver)
+    result: list = []
+
+    def _expanded(d: WebDriver) -> bool:
+        rect, w, h = _get_viewport_and_crop(d)
         if rect is not None and rect.width >= MIN_SIZE and rect.height >= MIN_SIZE:
-            _log("Captcha expanded: %dx%d at (%d, %d)" % (rect.width, rect.height, rect.left, rect.top))
-            return rect, w, h
-        if deadline is not None and time.time() >= deadline:
-            _log("Timeout: captcha did not expand in time")
-            raise TimeoutError("Captcha did not expand in time")
-        time.sleep(poll_interval)
+            result[:] = [rect, w, h]
+            return True
+        return False
+
+    try:
+        WebDriverWait(driver, timeout if timeout is not None else 1e9, poll_frequency=WAIT_POLL_S).until(_expanded)
+    except TimeoutException:
+        _log("Timeout: captcha did not expand in time")
+        raise TimeoutError("Captcha did not expand in time")
+    rect, w, h = result
+    _log("Captcha expanded: %dx%d at (%d, %d)" % (rect.width, rect.height, rect.left, rect.top))
+    return rect, w, h
 
 
 def _wait_for_iframe(driver: WebDriver, timeout: Optional[float] = None) -> None:
     """Wait until hCaptcha iframe is present. timeout=None = wait indefinitely."""
     _log("Waiting for hCaptcha iframe...")
-    poll_interval = 1.0
-    deadline = (time.time() + timeout) if timeout is not None else None
-    while True:
-        try:
-            if driver.find_elements(By.CSS_SELECTOR, "iframe[src*='hcaptcha.com']"):
-                _log("hCaptcha iframe found")
-                return
-        except Exception as e:
-            _log("Check iframe error: %s" % e)
-        if deadline is not None and time.time() >= deadline:
-            _log("Timeout: hCaptcha iframe did not appear")
-            raise TimeoutError("hCaptcha iframe did not appear in time")
-        time.sleep(poll_interval)
+    try:
+        WebDriverWait(driver, timeout if timeout is not None else 1e9, poll_frequency=WAIT_POLL_S).until(
+            lambda d: d.find_elements(By.CSS_SELECTOR, "iframe[src*='hcaptcha.com']")
+        )
+        _log("hCaptcha iframe found")
+    except TimeoutException:
+        _log("Timeout: hCaptcha iframe did not appear")
+        raise TimeoutError("hCaptcha iframe did not appear in time")
+
+
+def _wait_render_settled(driver: WebDriver, max_wait: float = 5.0) -> None:
+    """Adaptive replacement for the fixed post-expand delay.
+
+    Returns as soon as the widget's rect is identical across two consecutive
+    probes (the expand/zoom animation has finished and a real frame can be
+    captured) instead of always sleeping the full pad. Probe intervals grow
+    0.1 -> 0.2 -> 0.4 -> 0.8 capped at 1.0 s; max_wait bounds the total wait
+    so slow pages degrade to the old fixed delay.
+    """
+    deadline = time.perf_counter() + max_wait
+    interval = 0.1
+    prev = None
+    while time.perf_counter() < deadline:
+        time.sleep(min(interval, max(0.0, deadline - time.perf_counter())))
+        rect, _, _ = _get_viewport_and_crop(driver)
+        cur = (rect.left, rect.top, rect.width, rect.height) if rect else None
+        if cur is not None and cur == prev:
+            return
+        prev = cur
+        interval = min(interval * 2, 1.0)
 
 
 def _is_already_expanded(driver: WebDriver) -> bool:
@@ -128,7 +187,13 @@ def _open_checkbox_if_needed(
     - captcha_opens_automatically=False: if already expanded skip click, else click checkbox to expand.
     """
     _wait_for_iframe(driver, timeout=wait_captcha_timeout)
-    time.sleep(1.2)
+    # Wait until the widget has actually rendered (iframe has a rect) instead of a fixed pad.
+    try:
+        WebDriverWait(driver, 2.0, poll_frequency=WAIT_POLL_S).until(
+            lambda d: _get_viewport_and_crop(d)[0] is not None
+        )
+    except TimeoutException:
+        pass
     if captcha_opens_automatically:
         _log("Captcha opens automatically on this page; waiting for it to load (no checkbox click)")
         return
@@ -171,7 +236,72 @@ def _open_checkbox_if_needed(
         _click_checkbox_via_js(driver)
     finally:
         driver.switch_to.default_content()
-    time.sleep(1.5)
+    # Exit as soon as the click took effect; run_solve keeps waiting if it didn't.
+    try:
+        WebDriverWait(driver, 3.0, poll_frequency=WAIT_POLL_S).until(lambda d: _is_already_expanded(d))
+    except TimeoutException:
+        pass
+
+
+# Helper bundle installed once per JS context: subsequent hot-path calls ship
+# a ~40-byte invocation instead of a ~1KB script Chrome must re-parse.
+_KENZX_INSTALL_JS = """
+window.__kenzx = {
+  probe: function() {
+    var iframes = document.querySelectorAll('iframe[src*="hcaptcha.com"]');
+    var best = null, bestArea = 0;
+    for (var i = 0; i < iframes.length; i++) {
+      var r = iframes[i].getBoundingClientRect();
+      if (r.width < 50 || r.height < 50) continue;
+      var area = r.width * r.height;
+      if (area > bestArea) { bestArea = area; best = r; }
+    }
+    var el = document.querySelector("textarea[name='h-captcha-response'], input[name='h-captcha-response']");
+    var out = {
+      viewportW: window.innerWidth || 1280,
+      viewportH: window.innerHeight || 720,
+      iframePresent: iframes.length > 0,
+      token: (el && el.value) ? el.value : null
+    };
+    if (best) { out.left = Math.round(best.left); out.top = Math.round(best.top); out.width = Math.round(best.width); out.height = Math.round(best.height); }
+    return out;
+  },
+  ev: function(el, type, x, y, buttons) {
+    el.dispatchEvent(new MouseEvent(type, { view: window, bubbles: true, cancelable: true, clientX: x, clientY: y, button: 0, buttons: buttons }));
+  },
+  click: function(x, y) {
+    var el = document.elementFromPoint(x, y);
+    if (!el) return;
+    this.ev(el, 'mousedown', x, y, 1);
+    this.ev(el, 'mouseup', x, y, 0);
+    this.ev(el, 'click', x, y, 0);
+  },
+  drag: function(fx, fy, tx, ty) {
+    // A drag stays on its grab target (slider handle / tile); hit-test once
+    // instead of walking the render tree for all 12 interpolated moves.
+    var el = document.elementFromPoint(fx, fy) || document.body;
+    this.ev(el, 'mousedown', fx, fy, 1);
+    for (var i = 1; i <= 12; i++) {
+      var t = i / 12, x = Math.round(fx + (tx - fx) * t), y = Math.round(fy + (ty - fy) * t);
+      this.ev(el, 'mousemove', x, y, 1);
+    }
+    this.ev(document.elementFromPoint(tx, ty) || el, 'mouseup', tx, ty, 0);
+  }
+};
+"""
+
+
+def _kenzx_call(driver: WebDriver, expr: str, *args):
+    """Invoke a window.__kenzx helper, installing the bundle on first use.
+
+    The presence guard makes re-injection automatic after a navigation or in a
+    frame context that has not seen the bundle yet.
+    """
+    r = driver.execute_script("if (!window.__kenzx) return '__missing__'; " + expr, *args)
+    if r == "__missing__":
+        driver.execute_script(_KENZX_INSTALL_JS)
+        r = driver.execute_script(expr, *args)
+    return r
 
 
 def _inside(x: int, y: int, r: _CropRect) -> bool:
@@ -192,11 +322,39 @@ def _largest_frame(driver: WebDriver):
     return best if best else driver.find_element(By.CSS_SELECTOR, "iframe[src*='hcaptcha.com']")
 
 
-def _switch_challenge_frame(driver: WebDriver) -> None:
+def _switch_largest(driver: WebDriver, frame_cache: Optional[list] = None) -> None:
+    """Switch into the largest hCaptcha iframe, reusing a cached element when possible.
+
+    frame_cache is [outer, inner]: the outer challenge iframe and the nested
+    frame _switch_challenge_frame found inside it. References are only
+    re-queried when they have gone stale (DOM re-render), saving a
+    find_elements scan plus the inner trial-and-error switches per action.
+    """
+    frame = frame_cache[0] if frame_cache and frame_cache[0] is not None else _largest_frame(driver)
+    try:
+        driver.switch_to.frame(frame)
+    except StaleElementReferenceException:
+        frame = _largest_frame(driver)
+        driver.switch_to.frame(frame)
+        if frame_cache is not None and len(frame_cache) > 1:
+            frame_cache[1] = None  # outer re-rendered; inner reference is dead too
+    if frame_cache is not None:
+        frame_cache[0] = frame
+
+
+def _switch_challenge_frame(driver: WebDriver, frame_cache: Optional[list] = None) -> None:
+    if frame_cache is not None and len(frame_cache) > 1 and frame_cache[1] is not None:
+        try:
+            driver.switch_to.frame(frame_cache[1])
+            return
+        except Exception:
+            frame_cache[1] = None
     try:
         for f in driver.find_elements(By.CSS_SELECTOR, "iframe"):
             try:
                 driver.switch_to.frame(f)
+                if frame_cache is not None and len(frame_cache) > 1:
+                    frame_cache[1] = f
                 return
             except Exception:
                 pass
@@ -204,136 +362,362 @@ def _switch_challenge_frame(driver: WebDriver) -> None:
         pass
 
 
-def _click_in_frame(driver: WebDriver, ox: int, oy: int) -> None:
-    driver.switch_to.frame(_largest_frame(driver))
+def _click_in_frame(driver: WebDriver, ox: int, oy: int, frame_cache: Optional[list] = None) -> None:
+    _switch_largest(driver, frame_cache)
     try:
-        _switch_challenge_frame(driver)
+        _switch_challenge_frame(driver, frame_cache)
         time.sleep(0.05)
-        driver.execute_script("""
-            (function(x, y) {
-              var el = document.elementFromPoint(x, y);
-              if (!el) return;
-              ['mousedown', 'mouseup', 'click'].forEach(function(type) {
-                el.dispatchEvent(new MouseEvent(type, { view: window, bubbles: true, cancelable: true, clientX: x, clientY: y, button: 0, buttons: type === 'mousedown' ? 1 : 0 }));
-              });
-            })(arguments[0], arguments[1]);
-        """, ox, oy)
+        _kenzx_call(driver, "window.__kenzx.click(arguments[0], arguments[1]);", ox, oy)
     finally:
         driver.switch_to.default_content()
 
 
-def _click_main(driver: WebDriver, x: int, y: int) -> None:
-    body = driver.find_element(By.TAG_NAME, "body")
-    ActionChains(driver).move_to_element_with_offset(body, x, y).click().perform()
+def _get_body(driver: WebDriver, body_cache: Optional[list] = None):
+    """The main-page body element, cached across calls like _switch_largest does for frames."""
+    body = body_cache[0] if body_cache and body_cache[0] is not None else None
+    if body is None:
+        body = driver.find_element(By.TAG_NAME, "body")
+    if body_cache is not None:
+        body_cache[0] = body
+    return body
+
+
+def _click_main(driver: WebDriver, x: int, y: int, body_cache: Optional[list] = None) -> None:
+    body = _get_body(driver, body_cache)
+    try:
+        ActionChains(driver).move_to_element_with_offset(body, x, y).click().perform()
+    except StaleElementReferenceException:
+        if body_cache is not None:
+            body_cache[0] = None
+        body = _get_body(driver, body_cache)
+        ActionChains(driver).move_to_element_with_offset(body, x, y).click().perform()
 
 
-def _perform_click(driver: WebDriver, vx: int, vy: int, crop: Optional[_CropRect]) -> None:
+def _perform_click(
+    driver: WebDriver,
+    vx: int,
+    vy: int,
+    crop: Optional[_CropRect],
+    frame_cache: Optional[list] = None,
+    body_cache: Optional[list] = None,
+) -> None:
     if crop and _inside(vx, vy, crop):
-        _click_in_frame(driver, vx - crop.left, vy - crop.top)
+        _click_in_frame(driver, vx - crop.left, vy - crop.top, frame_cache)
     else:
-        _click_main(driver, vx, vy)
+        _click_main(driver, vx, vy, body_cache)
 
 
-def _drag_in_frame(driver: WebDriver, from_xy: tuple[int, int], to_xy: tuple[int, int]) -> None:
+def _drag_in_frame(
+    driver: WebDriver,
+    from_xy: tuple[int, int],
+    to_xy: tuple[int, int],
+    frame_cache: Optional[list] = None,
+) -> None:
     fx, fy = from_xy
     tx, ty = to_xy
-    driver.switch_to.frame(_largest_frame(driver))
+    _switch_largest(driver, frame_cache)
     try:
-        _switch_challenge_frame(driver)
+        _switch_challenge_frame(driver, frame_cache)
         time.sleep(0.05)
-        driver.execute_script("""
-            (function(fx, fy, tx, ty) {
-              var el = document.elementFromPoint(fx, fy);
-              if (!el) return;
-              el.dispatchEvent(new MouseEvent('mousedown', { view: window, bubbles: true, cancelable: true, clientX: fx, clientY: fy, button: 0, buttons: 1 }));
-              for (var i = 1; i <= 12; i++) {
-                var t = i / 12, x = Math.round(fx + (tx - fx) * t), y = Math.round(fy + (ty - fy) * t);
-                (document.elementFromPoint(x, y) || document.body).dispatchEvent(new MouseEvent('mousemove', { view: window, bubbles: true, cancelable: true, clientX: x, clientY: y, button: 0, buttons: 1 }));
-              }
-              (document.elementFromPoint(tx, ty) || document.body).dispatchEvent(new MouseEvent('mouseup', { view: window, bubbles: true, cancelable: true, clientX: tx, clientY: ty, button: 0, buttons: 0 }));
-            })(arguments[0], arguments[1], arguments[2], arguments[3]);
-        """, fx, fy, tx, ty)
+        _kenzx_call(driver, "window.__kenzx.drag(arguments[0], arguments[1], arguments[2], arguments[3]);", fx, fy, tx, ty)
     finally:
         driver.switch_to.default_content()
 
 
-def _drag_main(driver: WebDriver, from_xy: tuple[int, int], to_xy: tuple[int, int]) -> None:
-    body = driver.find_element(By.TAG_NAME, "body")
+def _drag_main(
+    driver: WebDriver,
+    from_xy: tuple[int, int],
+    to_xy: tuple[int, int],
+    body_cache: Optional[list] = None,
+) -> None:
+    """Drag on the main page in one execute_script (14 ActionChains round-trips otherwise)."""
     fx, fy = from_xy
     tx, ty = to_xy
-    ActionChains(driver).move_to_element_with_offset(body, fx, fy).click_and_hold().perform()
-    for i in range(1, 13):
-        t = i / 12.0
-        x, y = int(fx + (tx - fx) * t), int(fy + (ty - fy) * t)
-        ActionChains(driver).move_to_element_with_offset(body, x, y).perform()
-    ActionChains(driver).move_to_element_with_offset(body, tx, ty).release().perform()
+    try:
+        _kenzx_call(driver, "window.__kenzx.drag(arguments[0], arguments[1], arguments[2], arguments[3]);", fx, fy, tx, ty)
+    except Exception:
+        # One chain, one perform: the W3C actions protocol batches every move
+        # into a single POST /actions instead of 14 round-trips.
+        def _chain_drag() -> None:
+            body = _get_body(driver, body_cache)
+            chain = ActionChains(driver).move_to_element_with_offset(body, fx, fy).click_and_hold()
+            for i in range(1, 13):
+                t = i / 12.0
+                x, y = int(fx + (tx - fx) * t), int(fy + (ty - fy) * t)
+                chain = chain.move_to_element_with_offset(body, x, y)
+            chain.move_to_element_with_offset(body, tx, ty).release().perform()
+
+        try:
+            _chain_drag()
+        except StaleElementReferenceException:
+            if body_cache is not None:
+                body_cache[0] = None
+            _chain_drag()
 
 
-def _perform_drag(driver: WebDriver, from_xy: tuple[int, int], to_xy: tuple[int, int], crop: Optional[_CropRect]) -> None:
+def _perform_drag(
+    driver: WebDriver,
+    from_xy: tuple[int, int],
+    to_xy: tuple[int, int],
+    crop: Optional[_CropRect],
+    frame_cache: Optional[list] = None,
+    body_cache: Optional[list] = None,
+) -> None:
     fx, fy = from_xy
     tx, ty = to_xy
     if crop and _inside(fx, fy, crop) and _inside(tx, ty, crop):
-        _drag_in_frame(driver, (fx - crop.left, fy - crop.top), (tx - crop.left, ty - crop.top))
+        _drag_in_frame(driver, (fx - crop.left, fy - crop.top), (tx - crop.left, ty - crop.top), frame_cache)
     else:
-        _drag_main(driver, from_xy, to_xy)
+        _drag_main(driver, from_xy, to_xy, body_cache)
 
 
-def _get_token(driver: WebDriver) -> Optional[str]:
+def _fast_screenshot(driver: WebDriver, crop: Optional[_CropRect]) -> Optional[str]:
+    """JPEG capture straight from the renderer via CDP Page.captureScreenshot.
+
+    Skips ChromeDriver's full-viewport PNG encode entirely: Chrome crops to the
+    clip rect and encodes JPEG natively, returning base64 ready for the wire.
+    None when the driver has no execute_cdp_cmd (non-Chrome) or the call fails.
+    """
+    cdp = getattr(driver, "execute_cdp_cmd", None)
+    if cdp is None:
+        return None
+    params: dict = {"format": "jpeg", "quality": JPEG_QUALITY}
+    if crop:
+        params["clip"] = {
+            "x": crop.left, "y": crop.top,
+            "width": crop.width, "height": crop.height,
+            "scale": 1,
+        }
     try:
-        el = driver.find_element(By.CSS_SELECTOR, "textarea[name='h-captcha-response'], input[name='h-captcha-response']")
-        v = (el.get_attribute("value") or "").strip()
-        return v or None
-    except NoSuchElementException:
+        return cdp("Page.captureScreenshot", params).get("data")
+    except Exception:
         return None
 
 
-def _run_loop(driver: WebDriver, api: _ApiClient, task_id: str, crop: Optional[_CropRect]) -> None:
-    last_shot = [time.perf_counter()]
-    while True:
+def _capture_screenshot(
+    driver: WebDriver,
+    crop: Optional[_CropRect],
+    jpeg: bool = True,
+) -> tuple[bytes, str, bool]:
+    """Capture the viewport as raw image bytes.
+
+    Prefers CDP Page.captureScreenshot (pre-cropped, pre-encoded JPEG from the
+    renderer); otherwise re-encodes the PNG capture with Pillow as JPEG
+    (quality 70) cropped to the captcha rect — either way 5-10x fewer bytes on
+    the wire than the full-viewport PNG. Returns (image, mime, cropped); when
+    cropped is True the image already covers only the crop rect, so no
+    cropRect should be sent alongside it.
+    """
+    if jpeg:
+        b64 = _fast_screenshot(driver, crop)
+        if b64:
+            return base64.b64decode(b64), "image/jpeg", crop is not None
+    if jpeg and Image is not None:
         try:
-            resp = api.get_next_action(task_id)
-            status = resp.get("status")
-            if status in ("expired", "solved"):
-                _log("Session ended: %s" % status)
-                return
-            action = resp.get("action")
-            if isinstance(action, dict):
-                atype = action.get("type")
-                if atype == "click":
-                    x, y = action.get("x"), action.get("y")
-                    if x is not None and y is not None:
-                        _log("Worker action: click (%d, %d)" % (int(x), int(y)))
-                        _perform_click(driver, int(x), int(y), crop)
-                        time.sleep(0.08)
-                elif atype == "drag":
-                    fr, to = action.get("from"), action.get("to")
-                    if fr and to:
-                        _log("Worker action: drag")
-                        _perform_drag(driver, (int(fr["x"]), int(fr["y"])), (int(to["x"]), int(to["y"])), crop)
-                        time.sleep(0.08)
-            token = _get_token(driver)
-            if token:
-                _log("Captcha solved, submitting token...")
-                api.notify_solved(task_id, token)
-                _log("Token submitted successfully")
-                return
-            now = time.perf_counter()
-            if now - last_shot[0] >= SCREENSHOT_INTERVAL_S:
-                try:
-                    rect, w, h = _get_viewport_and_crop(driver)
-                    b64 = driver.get_screenshot_as_base64()
-                    dto = CropRectDto(rect.left, rect.top, rect.width, rect.height) if rect else None
-                    api.update_screenshot(task_id, "data:image/png;base64," + b64, w, h, dto)
-                    last_shot[0] = now
-                except Exception as e:
-                    _log("Screenshot update error: %s" % e)
-            time.sleep(POLL_S)
-        except KeyboardInterrupt:
-            _log("Interrupted by user")
+            img = Image.open(io.BytesIO(driver.get_screenshot_as_png()))
+            if crop:
+                img = img.crop((crop.left, crop.top, crop.left + crop.width, crop.top + crop.height))
+            buf = io.BytesIO()
+            img.convert("RGB").save(buf, "JPEG", quality=JPEG_QUALITY, optimize=False)
+            return buf.getvalue(), "image/jpeg", crop is not None
+        except Exception as e:
+            _log("JPEG re-encode failed, falling back to PNG: %s" % e)
+    return driver.get_screenshot_as_png(), "image/png", False
+
+
+def _get_token(driver: WebDriver) -> Optional[str]:
+    """One-round-trip token read; the hot loop gets it from _batch_probe instead."""
+    v = driver.execute_script(
+        "var t = document.querySelector(\"textarea[name='h-captcha-response'], input[name='h-captcha-response']\");"
+        " return t ? t.value : null;"
+    )
+    return (v or "").strip() or None
+
+
+def _batch_probe(driver: WebDriver) -> tuple[Optional[_CropRect], int, int, Optional[str], bool]:
+    """Crop rect, viewport, token and iframe presence in one execute_script round-trip.
+
+    The hot loop needs all four every iteration; fetching them separately costs
+    3-4 synchronous wire calls to chromedriver per tick. The standalone
+    _get_viewport_and_crop/_get_token remain for the setup path.
+    """
+    result = _kenzx_call(driver, "return window.__kenzx.probe();") or {}
+    rect = None
+    if "left" in result:
+        rect = _CropRect(
+            left=int(result.get("left", 0)),
+            top=int(result.get("top", 0)),
+            width=int(result.get("width", 0)),
+            height=int(result.get("height", 0)),
+        )
+    token = (result.get("token") or "").strip() or None
+    vw = int(result.get("viewportW") or 1280)
+    vh = int(result.get("viewportH") or 720)
+    return rect, vw, vh, token, bool(result.get("iframePresent"))
+
+
+def _frame_changed(img: bytes, state: list) -> bool:
+    """True when img shows a different screen than the frame recorded in state.
+
+    state is a mutable [thumb, hash] pair updated in place. With Pillow and
+    numpy available the comparison is perceptual — a 64x64 grayscale thumbnail
+    diffed against the previous one — since two JPEG encodes of an identical
+    screen are not guaranteed byte-identical. Falls back to the byte hash.
+    """
+    if Image is not None and np is not None:
+        try:
+            thumb = np.asarray(
+                Image.open(io.BytesIO(img)).convert("L").resize((64, 64), Image.BILINEAR),
+                dtype=np.int16,
+            )
+            if state[0] is not None and int(np.abs(thumb - state[0]).sum()) < THUMB_DIFF_THRESHOLD:
+                return False
+            state[0] = thumb
+            return True
+        except Exception:
+            pass
+    h = _frame_hash(img)
+    if h == state[1]:
+        return False
+    state[1] = h
+    return True
+
+
+def _uploader(api: _ApiClient, upload_q: "queue.Queue") -> None:
+    """Worker thread: POST queued screenshots so uploads never block the action poll."""
+    while True:
+        item = upload_q.get()
+        if item is None:
             return
+        try:
+            api.update_screenshot_binary(*item)
         except Exception as e:
-            _log("Loop error: %s" % e)
-            time.sleep(1.0)
+            _log("Screenshot upload error: %s" % e)
+
+
+def _run_loop(
+    driver: WebDriver,
+    api: _ApiClient,
+    task_id: str,
+    crop: Optional[_CropRect],
+    poll_interval: Optional[tuple[float, float, float]] = None,
+) -> None:
+    # Fixed-rate fallback pacing (only used when the server supports neither
+    # long-poll nor pollAfterMs hints): (min, max, growth factor) — the delay
+    # grows while no actions arrive and resets to min when one does.
+    poll_min, poll_max, poll_factor = poll_interval or (POLL_S, POLL_S, 1.0)
+    poll_delay = poll_min
+    # 0.0 so the first tick captures immediately — the session was started
+    # without a screenshot and the worker is waiting on this first frame.
+    last_shot = [0.0]
+    # Cached across iterations: the challenge frame element (re-queried only
+    # when stale) and the crop/viewport from the last _batch_probe result.
+    frame_cache: list = [None, None]
+    body_cache: list = [None]
+    cached_crop = crop
+    cached_vp = (1280, 720)
+    frame_state: list = [None, None]  # [thumb, hash] for _frame_changed
+    last_upload_ts = 0.0
+    # Capture stays on this thread (the WebDriver is not thread-safe); only the
+    # HTTP POST runs on the worker. maxsize=1 + put_nowait drops frames under
+    # backpressure instead of stalling the poll behind a slow upload.
+    upload_q: "queue.Queue" = queue.Queue(maxsize=1)
+    uploader = threading.Thread(target=_uploader, args=(api, upload_q), daemon=True)
+    uploader.start()
+    # Long-poll by default: the server holds next-action until something is
+    # queued, so an action arrives in ~1 RTT instead of up to POLL_S later.
+    # The wait budget is whatever is left until the next screenshot is due, so
+    # the capture cadence is unaffected. Disabled after the first response if
+    # the server ignores ?wait= (it would answer instantly and spin us hot).
+    long_poll = True
+    probed = False
+    error_streak = 0
+    try:
+        while True:
+            try:
+                if long_poll:
+                    budget = max(0.05, SCREENSHOT_INTERVAL_S - (time.perf_counter() - last_shot[0]))
+                    t0 = time.perf_counter()
+                    resp = api.wait_next_action(task_id, wait=budget)
+                    if not probed:
+                        probed = True
+                        if resp.get("action") is None and time.perf_counter() - t0 < budget * 0.25:
+                            long_poll = False
+                            _log("Server ignores long-poll wait; using fixed-rate polling")
+                else:
+                    resp = api.get_next_action(task_id)
+                error_streak = 0
+                status = resp.get("status")
+                if status in ("expired", "solved"):
+                    _log("Session ended: %s" % status)
+                    return
+                action = resp.get("action")
+                if isinstance(action, dict):
+                    poll_delay = poll_min
+                    atype = action.get("type")
+                    if atype == "click":
+                        x, y = action.get("x"), action.get("y")
+                        if x is not None and y is not None:
+                            _log("Worker action: click (%d, %d)" % (int(x), int(y)))
+                            _perform_click(driver, int(x), int(y), crop, frame_cache, body_cache)
+                            if not resp.get("moreActions"):
+                                time.sleep(0.08)
+                    elif atype == "drag":
+                        fr, to = action.get("from"), action.get("to")
+                        if fr and to:
+                            _log("Worker action: drag")
+                            _perform_drag(driver, (int(fr["x"]), int(fr["y"])), (int(to["x"]), int(to["y"])), crop, frame_cache, body_cache)
+                            if not resp.get("moreActions"):
+                                time.sleep(0.08)
+                rect, vw, vh, token, _present = _batch_probe(driver)
+                if rect:
+                    cached_crop = rect
+                    cached_vp = (vw, vh)
+                if token:
+                    _log("Captcha solved, submitting token...")
+                    api.notify_solved(task_id, token)
+                    _log("Token submitted successfully")
+                    return
+                now = time.perf_counter()
+                if now - last_shot[0] >= SCREENSHOT_INTERVAL_S:
+                    try:
+                        rect = cached_crop
+                        w, h = cached_vp
+                        img, mime, cropped = _capture_screenshot(driver, rect, jpeg=getattr(api, "jpeg_screenshots", False))
+                        last_shot[0] = now
+                        # Unchanged screen (worker thinking, nothing repainted):
+                        # skip the upload, with a keepalive so the server still
+                        # sees a frame every SCREENSHOT_KEEPALIVE_S.
+                        if _frame_changed(img, frame_state) or now - last_upload_ts >= SCREENSHOT_KEEPALIVE_S:
+                            dto = CropRectDto(rect.left, rect.top, rect.width, rect.height) if rect and not cropped else None
+                            try:
+                                upload_q.put_nowait((task_id, img, w, h, dto, mime))
+                                last_upload_ts = now
+                            except queue.Full:
+                                pass  # previous upload still in flight; drop this frame
+                    except Exception as e:
+                        _log("Screenshot update error: %s" % e)
+                if not long_poll:
+                    # Server-provided pacing hint wins; otherwise back off
+                    # while the worker is quiet.
+                    hint = resp.get("pollAfterMs")
+                    if hint is not None:
+                        time.sleep(max(0.0, float(hint) / 1000.0))
+                    else:
+                        time.sleep(poll_delay)
+                        if action is None:
+                            poll_delay = min(poll_delay * poll_factor, poll_max)
+            except KeyboardInterrupt:
+                _log("Interrupted by user")
+                return
+            except Exception as e:
+                error_streak += 1
+                backoff = min(2 ** error_streak * 0.1, 2.0)
+                _log("Loop error (backing off %.1fs): %s" % (backoff, e))
+                time.sleep(backoff)
+    finally:
+        upload_q.put(None)
+        uploader.join(timeout=5.0)
 
 
 def run_solve(
@@ -343,6 +727,7 @@ def run_solve(
     wait_captcha_timeout: Optional[float] = None,
     delay_after_captcha_load: float = 5.0,
     captcha_opens_automatically: bool = False,
+    poll_interval: Optional[tuple[float, float, float]] = None,
 ) -> Optional[str]:
     """
     Run the full remote solve flow. Driver must be on the page with captcha already.
@@ -351,6 +736,8 @@ def run_solve(
         (default 5) to avoid null/blank screenshots while the widget is still rendering.
     captcha_opens_automatically: if True, do not click the checkbox; the page opens the captcha itself
         (e.g. Discord). Library only waits for the captcha to be visible and expanded.
+    poll_interval: optional (min, max, factor) pacing for the fixed-rate poll fallback;
+        None keeps the flat POLL_S interval.
     Returns task_id on success, None on failure.
     """
     _open_checkbox_if_needed(
@@ -360,8 +747,8 @@ def run_solve(
     )
     crop, width, height = _wait_expanded(driver, timeout=wait_captcha_timeout)
     if delay_after_captcha_load > 0:
-        _log("Waiting %.1fs after captcha load before sending screenshot..." % delay_after_captcha_load)
-        time.sleep(delay_after_captcha_load)
+        _log("Waiting up to %.1fs for the captcha to finish rendering..." % delay_after_captcha_load)
+        _wait_render_settled(driver, max_wait=delay_after_captcha_load)
     _log("Creating task...")
     res = api.create_task(page_url)
     if res.get("errorId") != 0 or not res.get("taskId"):
@@ -369,9 +756,10 @@ def run_solve(
         return None
     task_id = res["taskId"]
     _log("Task created: %s. Starting remote session..." % task_id)
-    b64 = driver.get_screenshot_as_base64()
+    # No screenshot here: _run_loop posts the first frame on its first tick,
+    # keeping a full capture + upload off the startup critical path.
     dto = CropRectDto(crop.left, crop.top, crop.width, crop.height) if crop else None
-    api.start_remote_session(task_id, "data:image/png;base64," + b64, page_url, width, height, dto)
+    api.start_remote_session(task_id, None, page_url, width, height, dto)
     _log("Waiting for worker to solve...")
-    _run_loop(driver, api, task_id, crop)
+    _run_loop(driver, api, task_id, crop, poll_interval=poll_interval)
     return task_id
@@ -0,0 +1,327 @@
+"""asyncio variant of the solve loop: API I/O overlaps the WebDriver work.
+
+The sync loop in _solver.py is strictly serial — a click, the next-action
+poll and the screenshot upload each wait for the previous one. Here the API
+calls run on aiohttp while the blocking WebDriver calls go through
+run_in_executor, so an upload can be in flight while the next action is
+polled and performed. The sync loop stays the default; this is opt-in for
+callers already running an event loop.
+"""
+from __future__ import annotations
+
+import asyncio
+import base64
+from typing import Any, Optional, TYPE_CHECKING
+
+import aiohttp
+
+from kenzx_captcha.api_client import CropRectDto, _dumps
+from kenzx_captcha._solver import (
+    POLL_S,
+    SCREENSHOT_INTERVAL_S,
+    SCREENSHOT_KEEPALIVE_S,
+    _batch_probe,
+    _capture_screenshot,
+    _frame_changed,
+    _log,
+    _open_checkbox_if_needed,
+    _perform_click,
+    _perform_drag,
+    _wait_expanded,
+    _wait_render_settled,
+)
+
+if TYPE_CHECKING:
+    from selenium.webdriver.remote.webdriver import WebDriver
+
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+class _AsyncApiClient:
+    """aiohttp counterpart of _ApiClient; same endpoints, awaitable calls."""
+
+    def __init__(self, base_url: str, client_key: str, jpeg_screenshots: bool = True):
+        self._base_url = base_url.rstrip("/")
+        self._client_key = client_key or ""
+        self.jpeg_screenshots = jpeg_screenshots
+        self._binary_screenshots = True
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def _ensure_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=15, connect=3),
+                headers={"Cache-Control": "no-store"},
+            )
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    async def __aenter__(self) -> "_AsyncApiClient":
+        await self._ensure_session()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    async def _post_json(self, url: str, body: dict) -> dict[str, Any]:
+        session = await self._ensure_session()
+        async with session.post(url, data=_dumps(body), headers=_JSON_HEADERS) as r:
+            r.raise_for_status()
+            return await r.json()
+
+    async def create_task(self, page_url: Optional[str] = None) -> dict[str, Any]:
+        return await self._post_json(
+            f"{self._base_url}/api/createTask",
+            {
+                "clientKey": self._client_key,
+                "task": {
+                    "type": "RemoteCaptchaTask",
+                    "websiteURL": page_url or "https://accounts.hcaptcha.com/demo",
+                },
+            },
+        )
+
+    async def start_remote_session(
+        self,
+        task_id: str,
+        screenshot: Optional[str],
+        page_url: str,
+        width: int,
+        height: int,
+        crop_rect: Optional[CropRectDto] = None,
+    ) -> dict[str, Any]:
+        return await self._post_json(
+            f"{self._base_url}/api/client/remote-session/start",
+            {
+                "clientKey": self._client_key,
+                "taskId": task_id,
+                "screenshot": screenshot,
+                "pageUrl": page_url,
+                "width": width,
+                "height": height,
+                "cropRect": (
+                    {"left": crop_rect.left, "top": crop_rect.top, "width": crop_rect.width, "height": crop_rect.height}
+                    if crop_rect
+                    else None
+                ),
+            },
+        )
+
+    async def get_next_action(self, task_id: str) -> dict[str, Any]:
+        session = await self._ensure_session()
+        url = f"{self._base_url}/api/client/remote-session/{task_id}/next-action"
+        async with session.get(url, params={"clientKey": self._client_key}) as r:
+            r.raise_for_status()
+            return await r.json()
+
+    async def wait_next_action(self, task_id: str, wait: float = 10.0) -> dict[str, Any]:
+        session = await self._ensure_session()
+        url = f"{self._base_url}/api/client/remote-session/{task_id}/next-action"
+        async with session.get(
+            url,
+            params={"clientKey": self._client_key, "wait": wait},
+            timeout=aiohttp.ClientTimeout(total=wait + 5, connect=3),
+        ) as r:
+            r.raise_for_status()
+            return await r.json()
+
+    async def update_screenshot_binary(
+        self,
+        task_id: str,
+        image: bytes,
+        width: int,
+        height: int,
+        crop_rect: Optional[CropRectDto] = None,
+        mime: str = "image/jpeg",
+    ) -> None:
+        url = f"{self._base_url}/api/client/remote-session/{task_id}/screenshot"
+        session = await self._ensure_session()
+        if self._binary_screenshots:
+            headers = {"Content-Type": mime, "X-Width": str(width), "X-Height": str(height)}
+            if crop_rect:
+                headers["X-Crop-Rect"] = _dumps(
+                    {"left": crop_rect.left, "top": crop_rect.top, "width": crop_rect.width, "height": crop_rect.height}
+                ).decode("ascii")
+            async with session.post(url, data=image, headers=headers, params={"clientKey": self._client_key}) as r:
+                if r.status != 415:
+                    r.raise_for_status()
+                    return
+                self._binary_screenshots = False
+        await self._post_json(
+            url,
+            {
+                "clientKey": self._client_key,
+                "screenshot": "data:%s;base64,%s" % (mime, base64.b64encode(image).decode("ascii")),
+                "width": width,
+                "height": height,
+                "cropRect": (
+                    {"left": crop_rect.left, "top": crop_rect.top, "width": crop_rect.width, "height": crop_rect.height}
+                    if crop_rect
+                    else None
+                ),
+            },
+        )
+
+    async def notify_solved(self, task_id: str, token: str) -> None:
+        await self._post_json(
+            f"{self._base_url}/api/client/remote-session/{task_id}/solved",
+            {"clientKey": self._client_key, "token": token},
+        )
+
+
+async def _screenshot_uploader(api: _AsyncApiClient, upload_q: "asyncio.Queue") -> None:
+    while True:
+        item = await upload_q.get()
+        if item is None:
+            return
+        try:
+            await api.update_screenshot_binary(*item)
+        except Exception as e:
+            _log("Screenshot upload error: %s" % e)
+
+
+async def _run_loop_async(driver: "WebDriver", api: _AsyncApiClient, task_id: str, crop) -> None:
+    loop = asyncio.get_running_loop()
+    frame_cache: list = [None, None]
+    body_cache: list = [None]
+    cached_crop = crop
+    cached_vp = (1280, 720)
+    last_shot = 0.0  # first tick captures immediately; the session started without a frame
+    frame_state: list = [None, None]  # [thumb, hash] for _frame_changed
+    last_upload_ts = 0.0
+    error_streak = 0
+    upload_q: "asyncio.Queue" = asyncio.Queue(maxsize=1)
+    uploader = asyncio.create_task(_screenshot_uploader(api, upload_q))
+    # Same long-poll detection as the sync loop: if the first ?wait= response
+    # comes back empty well inside its budget, the server ignores the
+    # parameter and long-polling would busy-loop at RTT speed — fall back to
+    # fixed-rate polling with a sleep between requests.
+    long_poll = True
+    probed = False
+    try:
+        while True:
+            try:
+                if long_poll:
+                    budget = max(0.05, SCREENSHOT_INTERVAL_S - (loop.time() - last_shot))
+                    t0 = loop.time()
+                    resp = await api.wait_next_action(task_id, wait=budget)
+                    if not probed:
+                        probed = True
+                        if resp.get("action") is None and loop.time() - t0 < budget * 0.25:
+                            long_poll = False
+                            _log("Server ignores long-poll wait; using fixed-rate polling")
+                else:
+                    resp = await api.get_next_action(task_id)
+                error_streak = 0
+                status = resp.get("status")
+                if status in ("expired", "solved"):
+                    _log("Session ended: %s" % status)
+                    return
+                action = resp.get("action")
+                if isinstance(action, dict):
+                    atype = action.get("type")
+                    if atype == "click":
+                        x, y = action.get("x"), action.get("y")
+                        if x is not None and y is not None:
+                            _log("Worker action: click (%d, %d)" % (int(x), int(y)))
+                            await loop.run_in_executor(
+                                None, _perform_click, driver, int(x), int(y), crop, frame_cache, body_cache
+                            )
+                    elif atype == "drag":
+                        fr, to = action.get("from"), action.get("to")
+                        if fr and to:
+                            _log("Worker action: drag")
+                            await loop.run_in_executor(
+                                None,
+                                _perform_drag,
+                                driver,
+                                (int(fr["x"]), int(fr["y"])),
+                                (int(to["x"]), int(to["y"])),
+                                crop,
+                                frame_cache,
+                                body_cache,
+                            )
+                rect, vw, vh, token, _present = await loop.run_in_executor(None, _batch_probe, driver)
+                if rect:
+                    cached_crop = rect
+                    cached_vp = (vw, vh)
+                if token:
+                    _log("Captcha solved, submitting token...")
+                    await api.notify_solved(task_id, token)
+                    _log("Token submitted successfully")
+                    return
+                now = loop.time()
+                if now - last_shot >= SCREENSHOT_INTERVAL_S:
+                    rect = cached_crop
+                    w, h = cached_vp
+                    img, mime, cropped = await loop.run_in_executor(
+                        None, _capture_screenshot, driver, rect, api.jpeg_screenshots
+                    )
+                    last_shot = now
+                    if _frame_changed(img, frame_state) or now - last_upload_ts >= SCREENSHOT_KEEPALIVE_S:
+                        dto = CropRectDto(rect.left, rect.top, rect.width, rect.height) if rect and not cropped else None
+                        try:
+                            upload_q.put_nowait((task_id, img, w, h, dto, mime))
+                            last_upload_ts = now
+                        except asyncio.QueueFull:
+                            pass  # previous upload still in flight; drop this frame
+                if not long_poll:
+                    # Server-provided pacing hint wins; otherwise pace at POLL_S.
+                    hint = resp.get("pollAfterMs")
+                    if hint is not None:
+                        await asyncio.sleep(max(0.0, float(hint) / 1000.0))
+                    else:
+                        await asyncio.sleep(POLL_S)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                error_streak += 1
+                backoff = min(2 ** error_streak * 0.1, 2.0)
+                _log("Loop error (backing off %.1fs): %s" % (backoff, e))
+                await asyncio.sleep(backoff)
+    finally:
+        await upload_q.put(None)
+        await uploader
+
+
+async def run_solve_async(
+    driver: "WebDriver",
+    api: _AsyncApiClient,
+    page_url: str,
+    wait_captcha_timeout: Optional[float] = None,
+    delay_after_captcha_load: float = 5.0,
+    captcha_opens_automatically: bool = False,
+) -> Optional[str]:
+    """Async counterpart of run_solve; same flow, same return contract."""
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(
+        None,
+        lambda: _open_checkbox_if_needed(
+            driver,
+            wait_captcha_timeout=wait_captcha_timeout,
+            captcha_opens_automatically=captcha_opens_automatically,
+        ),
+    )
+    crop, width, height = await loop.run_in_executor(
+        None, lambda: _wait_expanded(driver, timeout=wait_captcha_timeout)
+    )
+    if delay_after_captcha_load > 0:
+        _log("Waiting up to %.1fs for the captcha to finish rendering..." % delay_after_captcha_load)
+        await loop.run_in_executor(None, _wait_render_settled, driver, delay_after_captcha_load)
+    _log("Creating task...")
+    res = await api.create_task(page_url)
+    if res.get("errorId") != 0 or not res.get("taskId"):
+        _log("Create task failed: errorId=%s %s" % (res.get("errorId"), res.get("errorDescription", "")))
+        return None
+    task_id = res["taskId"]
+    _log("Task created: %s. Starting remote session..." % task_id)
+    # No screenshot here: the loop posts the first frame on its first tick,
+    # keeping a full capture + upload off the startup critical path.
+    dto = CropRectDto(crop.left, crop.top, crop.width, crop.height) if crop else None
+    await api.start_remote_session(task_id, None, page_url, width, height, dto)
+    _log("Waiting for worker to solve...")
+    await _run_loop_async(driver, api, task_id, crop)
+    return task_id
@@ -1,9 +1,30 @@
 from __future__ import annotations
 
+import base64
+
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from typing import Any, Optional
 from dataclasses import dataclass
 
+# orjson encodes the multi-hundred-KB screenshot payloads 5-20x faster than
+# stdlib json; fall back silently when it is not installed.
+try:
+    import orjson
+
+    def _dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj)
+except ImportError:
+    import json
+
+    def _dumps(obj: Any) -> bytes:
+        return json.dumps(obj).encode("utf-8")
+
+# Connect timeout / read timeout for every call; the poll loop must never
+# hang on a dead connection.
+_TIMEOUT = (3, 10)
+
 
 @dataclass
 class CropRectDto:
@@ -16,10 +37,26 @@ class CropRectDto:
 class _ApiClient:
     """Internal API client for the captcha-platform (createTask + remote-session)."""
 
-    def __init__(self, base_url: str, client_key: str):
+    def __init__(self, base_url: str, client_key: str, jpeg_screenshots: bool = True):
         self._base_url = base_url.rstrip("/")
         self._client_key = client_key or ""
+        # When True the solver sends cropped JPEG data URLs instead of
+        # full-viewport PNGs (5-10x smaller); requires server-side support.
+        self.jpeg_screenshots = jpeg_screenshots
+        # Optimistic: cleared for the rest of the session the first time the
+        # server answers 415 to a raw-body screenshot upload.
+        self._binary_screenshots = True
         self._session = requests.Session()
+        # One host, ~10 req/s: pool connections and retry transient gateway
+        # errors with a short backoff so TLS handshakes are paid once, not
+        # whenever a connection drops mid-session.
+        adapter = HTTPAdapter(
+            pool_maxsize=8,
+            max_retries=Retry(total=2, status_forcelist=[502, 503, 504], backoff_factor=0.25),
+        )
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+        self._session.headers["Connection"] = "keep-alive"
         self._session.headers["Cache-Control"] = "no-store"
         self._session.headers["Content-Type"] = "application/json"
 
@@ -32,7 +69,7 @@ class _ApiClient:
                 "websiteURL": page_url or "https://accounts.hcaptcha.com/demo",
             },
         }
-        r = self._session.post(url, json=body)
+        r = self._session.post(url, data=_dumps(body), timeout=_TIMEOUT)
         r.raise_for_status()
         return r.json()
 
@@ -59,13 +96,30 @@ class _ApiClient:
                 else None
             ),
         }
-        r = self._session.post(url, json=body)
+        r = self._session.post(url, data=_dumps(body), timeout=_TIMEOUT)
         r.raise_for_status()
         return r.json()
 
     def get_next_action(self, task_id: str) -> dict[str, Any]:
         url = f"{self._base_url}/api/client/remote-session/{task_id}/next-action"
-        r = self._session.get(url, params={"clientKey": self._client_key})
+        r = self._session.get(url, params={"clientKey": self._client_key}, timeout=_TIMEOUT)
+        r.raise_for_status()
+        return r.json()
+
+    def wait_next_action(self, task_id: str, wait: float = 10.0) -> dict[str, Any]:
+        """Long-poll variant of get_next_action.
+
+        Passes ?wait= so the server can hold the request until an action is
+        queued or `wait` seconds elapse, replying immediately when one is
+        already pending. A server that ignores the parameter simply answers
+        right away, which callers detect and fall back on.
+        """
+        url = f"{self._base_url}/api/client/remote-session/{task_id}/next-action"
+        r = self._session.get(
+            url,
+            params={"clientKey": self._client_key, "wait": wait},
+            timeout=(_TIMEOUT[0], wait + 5),
+        )
         r.raise_for_status()
         return r.json()
 
@@ -89,10 +143,50 @@ class _ApiClient:
                 else None
             ),
         }
-        r = self._session.post(url, json=body)
+        r = self._session.post(url, data=_dumps(body), timeout=_TIMEOUT)
         r.raise_for_status()
 
+    def update_screenshot_binary(
+        self,
+        task_id: str,
+        image: bytes,
+        width: int,
+        height: int,
+        crop_rect: Optional[CropRectDto] = None,
+        mime: str = "image/jpeg",
+    ) -> None:
+        """Upload the screenshot as a raw image body with metadata in headers.
+
+        Skips the base64 encode and its 33% wire inflation entirely. Falls
+        back to the base64-in-JSON update_screenshot (and stops retrying the
+        raw path) when the server answers 415.
+        """
+        if self._binary_screenshots:
+            url = f"{self._base_url}/api/client/remote-session/{task_id}/screenshot"
+            headers = {
+                "Content-Type": mime,
+                "X-Width": str(width),
+                "X-Height": str(height),
+            }
+            if crop_rect:
+                headers["X-Crop-Rect"] = _dumps(
+                    {"left": crop_rect.left, "top": crop_rect.top, "width": crop_rect.width, "height": crop_rect.height}
+                ).decode("ascii")
+            r = self._session.post(
+                url,
+                data=image,
+                headers=headers,
+                params={"clientKey": self._client_key},
+                timeout=_TIMEOUT,
+            )
+            if r.status_code != 415:
+                r.raise_for_status()
+                return
+            self._binary_screenshots = False
+        data_url = "data:%s;base64,%s" % (mime, base64.b64encode(image).decode("ascii"))
+        self.update_screenshot(task_id, data_url, width, height, crop_rect)
+
     def notify_solved(self, task_id: str, token: str) -> None:
         url = f"{self._base_url}/api/client/remote-session/{task_id}/solved"
-        r = self._session.post(url, json={"clientKey": self._client_key, "token": token})
+        r = self._session.post(url, data=_dumps({"clientKey": self._client_key, "token": token}), timeout=_TIMEOUT)
         r.raise_for_status()
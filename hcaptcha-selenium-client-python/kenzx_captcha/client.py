@@ -7,6 +7,7 @@ Use solve() with your own WebDriver for more control (e.g. custom navigation).
 """
 from __future__ import annotations
 
+import threading
 import traceback
 from typing import Optional, Any, Callable
 
@@ -37,7 +38,7 @@ _STABLE_MODE_ARGS = [
 ]
 
 
-def _chrome_options(headless: bool = False, stable_mode: bool = False) -> Any:
+def _chrome_options(headless: bool = False, stable_mode: bool = False, chrome_args: Optional[list] = None) -> Any:
     """Build Chrome options (Selenium). Used when undetected_chromedriver is not used."""
     opts = webdriver.ChromeOptions()
     opts.add_argument("--disable-blink-features=AutomationControlled")
@@ -46,6 +47,8 @@ def _chrome_options(headless: bool = False, stable_mode: bool = False) -> Any:
     if stable_mode:
         for arg in _STABLE_MODE_ARGS:
             opts.add_argument(arg)
+    for arg in chrome_args or ():
+        opts.add_argument(arg)
     if headless:
         opts.add_argument("--headless=new")
     return opts
@@ -55,11 +58,13 @@ def create_driver(
     use_undetected: bool = True,
     headless: bool = False,
     stable_mode: bool = False,
+    chrome_args: Optional[list] = None,
 ) -> Any:
     """
     Create a Chrome WebDriver. With use_undetected=True (default), uses
     undetected-chromedriver so sites don't block. Use stable_mode=True for
     heavy sites like Discord to reduce Chrome crashes (disables GPU/sandbox).
+    chrome_args: extra Chrome flags appended to either driver flavor.
     """
     if use_undetected and _HAS_UC:
         opts = uc.ChromeOptions()
@@ -67,10 +72,12 @@ def create_driver(
         if stable_mode:
             for arg in _STABLE_MODE_ARGS:
                 opts.add_argument(arg)
+        for arg in chrome_args or ():
+            opts.add_argument(arg)
         if headless:
             opts.add_argument("--headless=new")
         return uc.Chrome(options=opts)
-    opts = _chrome_options(headless=headless, stable_mode=stable_mode)
+    opts = _chrome_options(headless=headless, stable_mode=stable_mode, chrome_args=chrome_args)
     return webdriver.Chrome(options=opts)
 
 
@@ -78,11 +85,13 @@ def _create_chrome_driver(
     use_undetected: bool,
     headless: bool,
     stable_mode: bool = False,
+    chrome_args: Optional[list] = None,
 ) -> Any:
     return create_driver(
         use_undetected=use_undetected,
         headless=headless,
         stable_mode=stable_mode,
+        chrome_args=chrome_args,
     )
 
 
@@ -96,6 +105,22 @@ class RemoteCaptchaClient:
         self.server_url = server_url.rstrip("/")
         self.api_key = api_key.strip()
         self._api = _ApiClient(self.server_url, self.api_key)
+        # Browser launched on this client's behalf; quit by shutdown().
+        self._driver: Any = None
+
+    def shutdown(self) -> None:
+        """Quit the browser this client launched, if one is still alive.
+
+        Idempotent and swallows quit errors, so it is safe to call from
+        atexit hooks and signal handlers; a no-op when run() already
+        cleaned up or no browser was launched.
+        """
+        driver, self._driver = self._driver, None
+        if driver is not None:
+            try:
+                driver.quit()
+            except Exception:
+                pass
 
     def solve(
         self,
@@ -105,6 +130,7 @@ class RemoteCaptchaClient:
         delay_after_captcha_load: float = 5.0,
         captcha_opens_automatically: bool = False,
         after_solve: Optional[Callable[[Any], None]] = None,
+        poll_interval: Optional[tuple[float, float, float]] = None,
     ) -> Optional[str]:
         """
         Solve the captcha on the current page. Driver must already be on a page with hCaptcha.
@@ -114,6 +140,7 @@ class RemoteCaptchaClient:
         captcha_opens_automatically: if True, do not click the checkbox; the page opens the captcha
             (e.g. Discord). Library only waits for it to be visible and expanded.
         after_solve: optional callback(driver) run after a successful solve (e.g. click submit button).
+        poll_interval: optional (min, max, factor) pacing for the fixed-rate poll fallback.
         Returns task_id if successful, None if create task failed.
         """
         task_id = run_solve(
@@ -123,6 +150,7 @@ class RemoteCaptchaClient:
             wait_captcha_timeout=wait_captcha_timeout,
             delay_after_captcha_load=delay_after_captcha_load,
             captcha_opens_automatically=captcha_opens_automatically,
+            poll_interval=poll_interval,
         )
         if task_id is not None and after_solve is not None:
             try:
@@ -142,6 +170,9 @@ class RemoteCaptchaClient:
         delay_after_captcha_load: float = 5.0,
         captcha_opens_automatically: bool = False,
         after_solve: Optional[Callable[[Any], None]] = None,
+        poll_interval: Optional[tuple[float, float, float]] = None,
+        chrome_args: Optional[list] = None,
+        teardown_async: bool = False,
     ) -> bool:
         """
         Open Chrome, load page_url, solve the captcha (worker solves remotely), then quit or wait.
@@ -153,6 +184,10 @@ class RemoteCaptchaClient:
         captcha_opens_automatically: if True, do not click the checkbox; the page opens the captcha
             (e.g. Discord). Library only waits for it to be visible and expanded.
         after_solve: optional callback(driver) run after a successful solve (e.g. click submit button).
+        poll_interval: optional (min, max, factor) pacing for the fixed-rate poll fallback.
+        chrome_args: extra Chrome flags for the launched browser (e.g. perf flags in CI).
+        teardown_async: quit the browser on a background thread instead of blocking the
+            return on Chrome shutdown (~0.5-2s); useful when the caller closes immediately.
         Returns True if solved successfully, False on error.
         """
         if stable_mode is None:
@@ -162,7 +197,9 @@ class RemoteCaptchaClient:
             use_undetected=use_undetected,
             headless=headless,
             stable_mode=stable_mode,
+            chrome_args=chrome_args,
         )
+        self._driver = driver
         try:
             driver.set_window_size(1280, 720)
             _log("Loading page: %s" % page_url)
@@ -174,6 +211,7 @@ class RemoteCaptchaClient:
                 wait_captcha_timeout=wait_captcha_timeout,
                 delay_after_captcha_load=delay_after_captcha_load,
                 captcha_opens_automatically=captcha_opens_automatically,
+                poll_interval=poll_interval,
             )
             if task_id is None:
                 _log("Solve failed (create task or captcha not ready)")
@@ -195,4 +233,12 @@ class RemoteCaptchaClient:
             traceback.print_exc()
             return False
         finally:
-            driver.quit()
+            self._driver = None
+            if teardown_async:
+                # Non-daemon on purpose: the interpreter joins it at shutdown,
+                # so the quit still completes when the caller exits right
+                # after run() returns — a daemon thread would be killed
+                # mid-quit and leak Chrome/chromedriver.
+                threading.Thread(target=driver.quit, name="driver-teardown").start()
+            else:
+                driver.quit()
@@ -17,22 +17,59 @@ Environment:
   HCAPTCHA_OPENS_AUTOMATICALLY - "1" or "true" if the page opens the captcha itself (e.g. Discord).
       When set, the library does NOT click the checkbox; it only waits for the captcha to be visible and loaded.
   HCAPTCHA_CLICK_SUBMIT_AFTER_SOLVE - "1" or "true" to click the submit button after solve (e.g. hCaptcha demo #hcaptcha-demo-submit).
+  HCAPTCHA_POLL_MIN / HCAPTCHA_POLL_MAX / HCAPTCHA_POLL_FACTOR - pacing for the
+      fixed-rate poll fallback: start at MIN seconds, multiply by FACTOR while the
+      worker is quiet, cap at MAX, reset on each action (defaults 0.12 / 1.0 / 1.5).
+  HCAPTCHA_BATCH_URLS - newline-separated URLs to solve with ONE browser
+      (also: --batch urls.txt). Chrome cold-start is paid once; each solve
+      runs in a fresh tab and the previous tab is closed.
+  When CI or HCAPTCHA_BATCH_URLS is set, the run is treated as unattended:
+      headless and auto-close are forced and Chrome gets resource-saving
+      flags (--disable-gpu, --disable-dev-shm-usage, --no-sandbox,
+      --disable-extensions).
 """
+import atexit
 import os
+import signal
 import sys
+import time
 
-from selenium.webdriver.common.by import By
+# selenium and kenzx_captcha are imported lazily (inside the functions that
+# need them): they pull in urllib3/webdriver machinery worth a few hundred ms
+# of cold start, which the usage-error path should not pay.
 
-from kenzx_captcha import RemoteCaptchaClient
+
+# One pass over the environ at import: every later read is a plain dict
+# lookup instead of another os.environ round-trip.
+_ENV = {k: v for k, v in os.environ.items() if k.startswith("HCAPTCHA_") or k in ("CI",)}
+
+# Chrome flags for unattended runs. No --blink-settings=imagesEnabled=false:
+# the captcha tiles ARE images, disabling them would break every solve.
+_PERF_CHROME_ARGS = [
+    "--disable-gpu",
+    "--disable-dev-shm-usage",
+    "--no-sandbox",
+    "--disable-extensions",
+]
+
+
+# Hosts that open the captcha themselves and need stable mode; one lowercase
+# allocation and one scan per URL, however many hosts get added here.
+_HEAVY_HOSTS = ("discord.com", "epicgames.com")
+
+
+def _is_heavy(page_url: str) -> bool:
+    page_url_lc = page_url.lower()
+    return any(h in page_url_lc for h in _HEAVY_HOSTS)
 
 
 def _env_bool(name: str, default: bool = False) -> bool:
-    v = os.environ.get(name, "").strip().lower()
+    v = _ENV.get(name, "").strip().lower()
     return v in ("1", "true", "yes") if v else default
 
 
 def _env_float(name: str, default: float | None = None) -> float | None:
-    v = os.environ.get(name, "").strip()
+    v = _ENV.get(name, "").strip()
     if not v:
         return default
     try:
@@ -41,74 +78,218 @@ def _env_float(name: str, default: float | None = None) -> float | None:
         return default
 
 
-def _click_demo_submit_after_solve(driver):
-    """Optional after_solve action: click the hCaptcha demo page submit button."""
-    try:
-        el = driver.find_element(By.XPATH, "//*[@id='hcaptcha-demo-submit']")
-        if el:
-            el.click()
-            print("[kenzx_captcha] Clicked submit button.", flush=True)
-    except Exception:
-        try:
-            el = driver.find_element(By.XPATH, "/html/body/div[5]/form/fieldset/ul/li[3]/input")
-            if el:
+def make_submit_clicker():
+    """Build an after_solve hook that clicks the hCaptcha demo submit button.
+
+    Looks the button up By.ID (direct getElementById, no XPath scan) with the
+    old absolute XPath as fallback, and caches the element per driver so
+    repeated solves on the same page skip the lookup; a stale cached element
+    just falls through to a fresh lookup. Only the expected Selenium errors
+    (missing/stale element, one intercepted-click retry) are swallowed —
+    anything else, e.g. a dead driver session, propagates to the caller.
+    """
+    from selenium.common.exceptions import (
+        ElementClickInterceptedException,
+        NoSuchElementException,
+        StaleElementReferenceException,
+    )
+    from selenium.webdriver.common.by import By
+
+    cache: dict = {}
+
+    def _click(driver):
+        el = cache.get(id(driver))
+        if el is not None:
+            try:
                 el.click()
                 print("[kenzx_captcha] Clicked submit button.", flush=True)
-        except Exception:
-            pass
+                return
+            except StaleElementReferenceException:
+                cache.pop(id(driver), None)
+        try:
+            el = driver.find_element(By.ID, "hcaptcha-demo-submit")
+        except NoSuchElementException:
+            try:
+                el = driver.find_element(By.XPATH, "/html/body/div[5]/form/fieldset/ul/li[3]/input")
+            except NoSuchElementException:
+                return
+        try:
+            el.click()
+        except ElementClickInterceptedException:
+            # One retry: the challenge overlay may still be fading out.
+            time.sleep(0.2)
+            el.click()
+        cache[id(driver)] = el
+        print("[kenzx_captcha] Clicked submit button.", flush=True)
+
+    return _click
+
+
+def _build_config() -> dict:
+    """Read the page-independent solve options from the environment once.
+
+    Page-dependent flags (stable mode, captcha_opens_automatically) are
+    resolved per URL so batch mode can mix heavy and light sites.
+    """
+    click_submit_after = _env_bool("HCAPTCHA_CLICK_SUBMIT_AFTER_SOLVE", False)
+    # CI / batch runs are unattended: nobody is watching a browser window and
+    # nothing should block on keep-open, so force headless + auto-close and
+    # trim Chrome down with the perf flags.
+    automated = bool(_ENV.get("CI") or _ENV.get("HCAPTCHA_BATCH_URLS"))
+    return {
+        "wait_timeout": _env_float("HCAPTCHA_WAIT_TIMEOUT"),
+        "delay_after_load": _env_float("HCAPTCHA_DELAY_AFTER_LOAD", 5.0) or 5.0,
+        "headless": True if automated else _env_bool("HCAPTCHA_HEADLESS", False),
+        "keep_open": False if automated else _env_bool("HCAPTCHA_KEEP_OPEN", True),
+        "chrome_args": _PERF_CHROME_ARGS if automated else None,
+        "stable_mode": _env_bool("HCAPTCHA_STABLE_MODE"),
+        "opens_auto": _env_bool("HCAPTCHA_OPENS_AUTOMATICALLY"),
+        "after_solve": make_submit_clicker() if click_submit_after else None,
+        "poll_interval": (
+            _env_float("HCAPTCHA_POLL_MIN", 0.12) or 0.12,
+            _env_float("HCAPTCHA_POLL_MAX", 1.0) or 1.0,
+            _env_float("HCAPTCHA_POLL_FACTOR", 1.5) or 1.5,
+        ),
+    }
+
+
+def _batch_urls(args: list) -> list:
+    """URLs for batch mode: --batch <file> takes precedence over HCAPTCHA_BATCH_URLS."""
+    raw = _ENV.get("HCAPTCHA_BATCH_URLS", "")
+    if "--batch" in args:
+        i = args.index("--batch")
+        if i + 1 < len(args):
+            with open(args[i + 1]) as f:
+                raw = f.read()
+    return [u.strip() for u in raw.splitlines() if u.strip()]
+
+
+def run_one(client, driver, page_url: str, cfg: dict) -> bool:
+    """Solve one captcha in the already-running browser."""
+    is_heavy = _is_heavy(page_url)
+    driver.get(page_url)
+    task_id = client.solve(
+        driver,
+        page_url=page_url,
+        wait_captcha_timeout=cfg["wait_timeout"],
+        delay_after_captcha_load=cfg["delay_after_load"],
+        captcha_opens_automatically=cfg["opens_auto"] or is_heavy,
+        after_solve=cfg["after_solve"],
+        poll_interval=cfg["poll_interval"],
+    )
+    return task_id is not None
+
+
+def _run_batch(client, urls: list, cfg: dict) -> int:
+    """Solve every URL with one browser.
+
+    Chrome cold-start (2-5 s) and driver init are paid once for the whole
+    batch; each solve runs in a fresh tab and the previous tab is closed so
+    memory does not accumulate across solves.
+    """
+    from kenzx_captcha import create_driver
+
+    stable_mode = cfg["stable_mode"] or any(_is_heavy(u) for u in urls)
+    driver = create_driver(
+        use_undetected=True,
+        headless=cfg["headless"],
+        stable_mode=stable_mode,
+        chrome_args=cfg["chrome_args"],
+    )
+    client._driver = driver  # visible to client.shutdown() / the atexit reaper
+    failures = 0
+    try:
+        driver.set_window_size(1280, 720)
+        for i, url in enumerate(urls):
+            if i:
+                prev = driver.current_window_handle
+                driver.switch_to.new_window("tab")
+                fresh = driver.current_window_handle
+                driver.switch_to.window(prev)
+                driver.close()
+                driver.switch_to.window(fresh)
+            # One bad URL (e.g. captcha never appears and the wait times out)
+            # must not abort the rest of the batch: solve() does not catch,
+            # so anything it raises is counted here and the loop moves on.
+            try:
+                ok = run_one(client, driver, url, cfg)
+            except Exception as e:
+                print("[kenzx_captcha] Solve failed for %s: %s" % (url, e), flush=True)
+                ok = False
+            if not ok:
+                failures += 1
+    finally:
+        client.shutdown()
+    return 1 if failures else 0
 
 
 def main() -> int:
-    # --- Server URL: first arg if it looks like a URL, else env, else default ---
-    server_url = os.environ.get("HCAPTCHA_SERVER_URL", "https://hcaptchasolver.com")
-    api_key = os.environ.get("HCAPTCHA_CLIENT_KEY", "").strip()
-    if len(sys.argv) >= 2:
-        if sys.argv[1].startswith("http"):
-            server_url = sys.argv[1]
-            api_key = (sys.argv[2] if len(sys.argv) >= 3 else os.environ.get("HCAPTCHA_CLIENT_KEY", "")).strip()
+    # --- One pass over argv: anything URL-shaped is the server URL, anything
+    # else is the API key; --batch and its operand belong to _batch_urls. ---
+    args = sys.argv[1:]
+    urls: list = []
+    keys: list = []
+    skip = False
+    for a in args:
+        if skip:
+            skip = False
+        elif a == "--batch":
+            skip = True
+        elif a.startswith(("http://", "https://")):
+            urls.append(a)
         else:
-            api_key = sys.argv[1].strip()
+            keys.append(a)
+    server_url = urls[0] if urls else _ENV.get("HCAPTCHA_SERVER_URL", "https://hcaptchasolver.com")
+    api_key = (keys[0] if keys else _ENV.get("HCAPTCHA_CLIENT_KEY", "")).strip()
     if not api_key:
         print("Error: Set HCAPTCHA_CLIENT_KEY or pass: python main.py [<serverUrl>] <apiKey>")
         return 1
 
-    # --- Optional: page to open (e.g. Discord register, or demo) ---
-    page_url = os.environ.get("HCAPTCHA_PAGE_URL", "https://accounts.hcaptcha.com/demo")
-
-    # --- Optional: max seconds to wait for captcha to appear (None = wait forever) ---
-    wait_timeout = _env_float("HCAPTCHA_WAIT_TIMEOUT")
+    from kenzx_captcha import RemoteCaptchaClient
 
-    # --- Optional: delay after captcha loads before sending first screenshot (default 5s to avoid null screenshot) ---
-    delay_after_load = _env_float("HCAPTCHA_DELAY_AFTER_LOAD", 5.0) or 5.0
-
-    # --- Optional: stable mode for heavy sites like Discord (reduces Chrome crashes) ---
-    stable_mode = _env_bool("HCAPTCHA_STABLE_MODE") or ("discord.com" in page_url.lower())
+    cfg = _build_config()
+    client = RemoteCaptchaClient(server_url, api_key)
 
-    # --- Optional: run browser headless ---
-    headless = _env_bool("HCAPTCHA_HEADLESS", False)
+    # Reap the browser on abnormal exits (Ctrl-C at the keep-open prompt,
+    # SIGTERM, crashes) so Chrome and chromedriver do not outlive the script.
+    # The normal return path flips the flag, honoring keep_open.
+    _reaped = [False]
 
-    # --- Optional: keep browser open after solve (default True so you can see result) ---
-    keep_open = _env_bool("HCAPTCHA_KEEP_OPEN", True)
+    def _reap() -> None:
+        if not _reaped[0]:
+            _reaped[0] = True
+            client.shutdown()
 
-    # --- Optional: page opens captcha automatically (e.g. Discord). If True, we don't click checkbox, only wait for load ---
-    captcha_opens_automatically = _env_bool("HCAPTCHA_OPENS_AUTOMATICALLY") or ("discord.com" in page_url.lower())
+    atexit.register(_reap)
+    signal.signal(signal.SIGTERM, lambda *_: (_reap(), sys.exit(143)))
 
-    # --- Optional: after solve, run an action with the driver (e.g. click submit on demo page) ---
-    click_submit_after = _env_bool("HCAPTCHA_CLICK_SUBMIT_AFTER_SOLVE", False)
-    after_solve = _click_demo_submit_after_solve if click_submit_after else None
+    # --- Batch mode: one browser, N solves ---
+    batch = _batch_urls(sys.argv[1:])
+    if batch:
+        rc = _run_batch(client, batch, cfg)
+        _reaped[0] = True  # _run_batch already quit its browser
+        return rc
 
-    client = RemoteCaptchaClient(server_url, api_key)
+    # --- Single solve: page to open (e.g. Discord register, or demo) ---
+    page_url = _ENV.get("HCAPTCHA_PAGE_URL", "https://accounts.hcaptcha.com/demo")
+    is_heavy = _is_heavy(page_url)
     ok = client.run(
         page_url=page_url,
-        keep_browser_open=keep_open,
-        headless=headless,
+        keep_browser_open=cfg["keep_open"],
+        headless=cfg["headless"],
         use_undetected=True,
-        stable_mode=stable_mode,
-        wait_captcha_timeout=wait_timeout,
-        delay_after_captcha_load=delay_after_load,
-        captcha_opens_automatically=captcha_opens_automatically,
-        after_solve=after_solve,
+        stable_mode=cfg["stable_mode"] or is_heavy,
+        wait_captcha_timeout=cfg["wait_timeout"],
+        delay_after_captcha_load=cfg["delay_after_load"],
+        captcha_opens_automatically=cfg["opens_auto"] or is_heavy,
+        after_solve=cfg["after_solve"],
+        poll_interval=cfg["poll_interval"],
+        chrome_args=cfg["chrome_args"],
+        # When we click submit and close right away, Chrome shutdown can
+        # overlap the post-click navigation instead of waiting on it.
+        teardown_async=cfg["after_solve"] is not None and not cfg["keep_open"],
     )
+    _reaped[0] = cfg["keep_open"]
     return 0 if ok else 1
 
 